@@ -3,18 +3,23 @@ Advanced Analytics Module
 Extended analytics functions for deeper insights
 """
 
+import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from scipy import stats
+from scipy import stats, sparse
 from datetime import datetime, timedelta
 from typing import Dict, List
 import warnings
 warnings.filterwarnings('ignore')
 
-from modules.translations import get_text, translate_segment_name, translate_day_name
+from modules.translations import get_text, get_filename, translate_segment_name, translate_day_name
 from modules.business_analytics import BusinessAnalyzer
+from modules.itemsets import frequent_itemsets, association_rules
+from modules.forecasting import DemandForecaster
+from modules.backtest import backtest_forecast
+from modules.cohorts import CohortAnalysis
 from modules.logger import get_logger
 
 # Initialize logger for this module
@@ -39,8 +44,37 @@ class AdvancedAnalytics:
 
         self.analyzer = analyzer
         self.trend_analysis = None
+        self._forecaster = None  # Product x day matrices, rebuilt when the analyzer's data changes
+        self._forecaster_version = None
+        self.cohort_analysis = None
+        self.cohort_heatmap = None
         logger.info(f"AdvancedAnalytics initialized for project: {self.analyzer.config['project_name']}")
 
+    @property
+    def forecaster(self) -> DemandForecaster:
+        """Product x day forecasting matrices, built once per data version"""
+        if self._forecaster is None or self._forecaster_version != self.analyzer.data_version:
+            self._forecaster = DemandForecaster(self.analyzer.data, self.analyzer.config)
+            self._forecaster_version = self.analyzer.data_version
+        return self._forecaster
+
+    @property
+    def trend_cube(self) -> Dict:
+        """
+        Daily and weekly aggregates for the trend panels, read from the analyzer's sales cube
+
+        Returns:
+            Dict with 'daily' (revenue and distinct transactions per day, days without sales included),
+            'weekday' (average line revenue per weekday name) and 'weekly_products' (revenue per week x product, wide)
+        """
+        cube = self.analyzer.cube
+        weekday_totals = cube.rollup('weekday', ['revenue', 'lines'])
+        return {
+            'daily': cube.daily(['revenue', 'transactions']),
+            'weekday': weekday_totals['revenue'] / weekday_totals['lines'],
+            'weekly_products': cube.rollup(['week', 'product'], ['revenue'])['revenue'].unstack()
+        }
+
     # CALCULATION METHODS
 
     def calculate_revenue_forecast(self, days_ahead: int = 30) -> Dict:
@@ -82,6 +116,76 @@ class AdvancedAnalytics:
             'trend': trend
         }
 
+    def calculate_forecast_backtest(self, method: str = 'revenue_forecast', cutoffs: List = None, days_ahead: int = 30,
+                                    max_workers: int = None, **params) -> pd.DataFrame:
+        """
+        Rolling-origin backtest of a daily revenue forecast
+
+        Args:
+            method: 'revenue_forecast' (the calculate_revenue_forecast model), 'moving_average',
+                'exponential_smoothing' or 'seasonal_naive'
+            cutoffs: First forecast day of each fold (defaults to weekly origins with a full horizon after them)
+            days_ahead: Days forecast in each fold
+            max_workers: Upper bound on worker processes (1 runs the folds in this process)
+            **params: Model parameters (window, alpha, season)
+
+        Returns:
+            DataFrame per fold with MAE, MAPE and interval coverage; attrs['summary'] holds their averages
+        """
+        if self.analyzer.data is None:
+            return pd.DataFrame()
+
+        # One daily aggregate shared by every fold
+        daily_revenue = self.forecaster.daily_totals('revenue')
+        return backtest_forecast(daily_revenue, method=method, cutoffs=cutoffs, horizon=days_ahead,
+                                 max_workers=max_workers, **params)
+
+    def calculate_product_forecasts(self, days_ahead: int = 30, method: str = 'exponential_smoothing',
+                                    measure: str = 'quantity', **params) -> pd.DataFrame:
+        """
+        Forecast every product at once with a simple model
+
+        Args:
+            days_ahead: Days to forecast
+            method: 'moving_average', 'exponential_smoothing' or 'seasonal_naive'
+            measure: 'quantity' or 'revenue'
+            **params: Model parameters (window, alpha, season)
+
+        Returns:
+            DataFrame per product (largest forecast first) with description, forecast and 95% interval
+        """
+        if self.analyzer.data is None:
+            return pd.DataFrame()
+
+        logger.debug(f"Forecasting {measure} per product with {method} for {days_ahead} days...")
+        forecasts = self.forecaster.forecast(method=method, horizon=days_ahead, measure=measure, **params)
+        forecasts.insert(0, 'description', self.analyzer.product_names(forecasts.index))
+        return forecasts.sort_values('forecast_total', ascending=False)
+
+    def calculate_reorder_plan(self, lead_time_days: int = 7, days_ahead: int = 30,
+                               method: str = 'exponential_smoothing', **params) -> pd.DataFrame:
+        """
+        Reorder points and dead-stock risk per product from the quantity forecasts
+
+        Args:
+            lead_time_days: Days between ordering and receiving stock
+            days_ahead: Horizon used to judge dead-stock risk
+            method: Forecast method (see calculate_product_forecasts)
+            **params: Model parameters
+
+        Returns:
+            DataFrame per product with reorder point, expected units, dead-stock risk and current inventory status
+        """
+        if self.analyzer.data is None:
+            return pd.DataFrame()
+
+        plan = self.forecaster.reorder_plan(lead_time_days=lead_time_days, horizon=days_ahead, method=method, **params)
+        plan.insert(0, 'description', self.analyzer.product_names(plan.index))
+        if self.analyzer.inventory is not None:
+            status = self.analyzer.inventory.set_index(self.analyzer.config['product_col'])['status']
+            plan['status'] = status.reindex(plan.index)
+        return plan.sort_values('reorder_point', ascending=False)
+
     def calculate_cross_sell_opportunities(self, min_support: float = 0.01, limit: int = 3) -> List[Dict]:
         """Find products frequently bought together"""
         if self.analyzer.data is None:
@@ -89,49 +193,97 @@ class AdvancedAnalytics:
 
         logger.debug(f"Calculating cross-sell opportunities (min_support={min_support}, limit={limit})...")
 
-        # Group products by transaction
-        transaction_products = self.analyzer.data.groupby(self.analyzer.config['transaction_col'])[
-            self.analyzer.config['product_col']
-        ].apply(list).reset_index()
+        # Pair counts for every product pair from one sparse product: (T x P)^T (T x P)
+        baskets = self.analyzer.baskets
+        co_occurrence = baskets.co_occurrence()
+        product_counts = co_occurrence.diagonal() # Baskets containing each product
+        pairs = sparse.triu(co_occurrence, k=1).tocoo() # Each unordered pair once (codes sorted like product ids)
+
+        # Calculate support, keeping only pairs above min_support
+        total_transactions = len(baskets)
+        counts = pairs.data
+        frequent = counts >= min_support * total_transactions
+        rows, cols, counts = pairs.row[frequent], pairs.col[frequent], counts[frequent]
+        if len(counts) == 0 or limit <= 0:
+            return []
 
-        # Find product pairs
-        from itertools import combinations
-        product_pairs = {}
+        # Top pairs by frequency with a partial sort, then order just those (ties by product id)
+        k = min(limit, len(counts))
+        kth_count = -np.partition(-counts, k - 1)[k - 1]
+        top = np.flatnonzero(counts >= kth_count) # Top k plus any pairs tied with the k-th
+        top = top[np.lexsort((cols[top], rows[top], -counts[top]))][:k]
+        rows, cols, counts = rows[top], cols[top], counts[top]
 
-        for products in transaction_products[self.analyzer.config['product_col']]:
-            if len(products) > 1:
-                for pair in combinations(set(products), 2):
-                    sorted_pair = tuple(sorted(pair))
-                    product_pairs[sorted_pair] = product_pairs.get(sorted_pair, 0) + 1
+        support = counts / total_transactions
+        confidence = counts / product_counts[rows] # Share of product_1 baskets that also hold product_2
+        lift = support / ((product_counts[rows] / total_transactions) * (product_counts[cols] / total_transactions))
 
-        # Calculate support
-        total_transactions = len(transaction_products)
+        names = self.analyzer.product_names(baskets.products)
         opportunities = []
-
-        for pair, count in sorted(product_pairs.items(), key=lambda x: x[1], reverse=True):
-            support = count / total_transactions
-            if support >= min_support:
-                # Get product names
-                prod1_name = self.analyzer.data[self.analyzer.data[self.analyzer.config['product_col']] == pair[0]][
-                    self.analyzer.config['description_col']
-                ].iloc[0] if len(self.analyzer.data[self.analyzer.data[self.analyzer.config['product_col']] == pair[0]]) > 0 else pair[0]
-
-                prod2_name = self.analyzer.data[self.analyzer.data[self.analyzer.config['product_col']] == pair[1]][
-                    self.analyzer.config['description_col']
-                ].iloc[0] if len(self.analyzer.data[self.analyzer.data[self.analyzer.config['product_col']] == pair[1]]) > 0 else pair[1]
-
-                opportunities.append({
-                    'product_1': prod1_name,
-                    'product_2': prod2_name,
-                    'frequency': count,
-                    'support': support * 100,
-                    'recommendation': f"Bundle {prod1_name[:20]}... with {prod2_name[:20]}..."
-                })
-                if len(opportunities) >= limit:
-                    break
+        for n in range(len(counts)):
+            prod1_name, prod2_name = names[rows[n]], names[cols[n]]
+            opportunities.append({
+                'product_1': prod1_name,
+                'product_2': prod2_name,
+                'frequency': int(counts[n]),
+                'support': support[n] * 100,
+                'confidence': confidence[n] * 100,
+                'lift': lift[n],
+                'recommendation': f"Bundle {prod1_name[:20]}... with {prod2_name[:20]}..."
+            })
 
         return opportunities
 
+    def calculate_bundle_opportunities(self, min_support: float = 0.01, max_len: int = 4, min_confidence: float = 0.5,
+                                       min_size: int = 3, limit: int = 3) -> List[Dict]:
+        """
+        Find bundles of 3+ products bought together, mined with FP-Growth
+
+        Args:
+            min_support: Minimum share of transactions containing the bundle (0-1)
+            max_len: Largest bundle size to mine
+            min_confidence: Minimum confidence of the bundle's best rule (0-1)
+            min_size: Smallest bundle size to report (pairs are covered by cross-selling)
+            limit: Maximum number of bundles
+
+        Returns:
+            List of bundles with products, frequency, support, confidence and lift of the best rule
+        """
+        if self.analyzer.data is None:
+            return []
+
+        logger.debug(f"Mining bundles (min_support={min_support}, max_len={max_len}, min_confidence={min_confidence})...")
+        baskets = self.analyzer.baskets
+        itemsets = frequent_itemsets(baskets, min_support=min_support, max_len=max_len)
+        rules = association_rules(itemsets, min_confidence=min_confidence, min_len=min_size)
+        if len(rules) == 0:
+            return []
+
+        # Best rule per bundle, then the most frequent bundles first
+        rules = rules.sort_values(['confidence', 'lift'], ascending=False).drop_duplicates('itemset')
+        rules = rules.sort_values(['support', 'confidence'], ascending=False).head(limit)
+
+        names = self.analyzer.product_names(baskets.products)
+        n_transactions = len(baskets)
+        bundles = []
+        for rule in rules.itertuples(index=False):
+            products = [names[code] for code in rule.itemset]
+            antecedent = [names[code] for code in rule.antecedent]
+            consequent = [names[code] for code in rule.consequent]
+            bundles.append({
+                'products': products,
+                'size': len(products),
+                'frequency': int(round(rule.support * n_transactions)),
+                'support': rule.support * 100,
+                'confidence': rule.confidence * 100,
+                'lift': rule.lift,
+                'antecedent': antecedent,
+                'consequent': consequent,
+                'recommendation': f"Offer {' + '.join(p[:20] for p in consequent)} with {' + '.join(p[:20] for p in antecedent)}"
+            })
+
+        return bundles
+
     def calculate_customer_segmentation_rfm(self) -> Dict:
         """Perform RFM (Recency, Frequency, Monetary) analysis"""
         logger.debug("Starting RFM customer segmentation analysis")
@@ -144,13 +296,13 @@ class AdvancedAnalytics:
         analysis_date = pd.Timestamp(self.analyzer.config['analysis_date'])
         logger.debug(f"Analysis date: {analysis_date}")
 
-        rfm = self.analyzer.data.groupby(self.analyzer.config['customer_col']).agg({
-            self.analyzer.config['date_col']: lambda x: (analysis_date - x.max()).days, # Recency
-            self.analyzer.config['transaction_col']: 'nunique', # Frequency
-            self.analyzer.config['revenue_col']: 'sum' # Monetary
-        })
-
-        rfm.columns = ['Recency', 'Frequency', 'Monetary']
+        # Built-in reductions only; recency is derived from the last purchase afterwards
+        rfm = self.analyzer.data.groupby(self.analyzer.config['customer_col'], observed=True).agg(
+            Recency=(self.analyzer.config['date_col'], 'max'), # Last purchase
+            Frequency=(self.analyzer.config['transaction_col'], 'nunique'), # Frequency
+            Monetary=(self.analyzer.config['revenue_col'], 'sum') # Monetary
+        )
+        rfm['Recency'] = (analysis_date - rfm['Recency']).dt.days # Recency in days
         logger.debug(f"RFM data shape: {rfm.shape}")
         logger.debug(f"Recency range: {rfm['Recency'].min():.0f} to {rfm['Recency'].max():.0f} days")
         logger.debug(f"Frequency range: {rfm['Frequency'].min():.0f} to {rfm['Frequency'].max():.0f} transactions")
@@ -191,55 +343,44 @@ class AdvancedAnalytics:
 
         logger.debug(f"Segmentation boundaries: R_max={r_max}, F_max={f_max}, M_max={m_max}, R_min={r_min}, M_median_value={m_median_value}")
 
-        def segment_customers(row):
-            r = row['Recency_Quartile']
-            f = row['Frequency_Quartile']
-            m = row['Monetary_Quartile']
-            m_value = row['Monetary']  # Actual monetary value for median comparison
-
-            # 1. Champions: Best in all 3 dimensions
-            if m == m_max and f == f_max and r == r_max:
-                return 'Champions'
-
-            # 2. High Value Customers: High spenders who are either frequent OR recent (but not both)
-            elif m == m_max and (f == f_max or r == r_max):
-                return 'High Value Customers'
-
-            # 3. Loyal Customers: Frequent buyers (but not high spenders)
-            elif f == f_max:
-                return 'Loyal Customers'
-
-            # 4. Recent High Spenders: Recent + decent spending (but not champions/high value/loyal)
-            elif r == r_max and m_value >= m_median_value:
-                return 'Recent High Spenders'
-
-            # 5. At Risk - High Value: High spenders who haven't purchased recently
-            elif m == m_max and r == r_min:
-                return 'At Risk - High Value'
-
-            # 6. At Risk: Haven't purchased recently (not high spenders)
-            elif r == r_min:
-                return 'At Risk'
+        r = rfm['Recency_Quartile']
+        f = rfm['Frequency_Quartile']
+        m = rfm['Monetary_Quartile']
 
-            # 7. Need Attention: Everyone else (moderate on all dimensions)
-            else:
-                return 'Need Attention'
+        # Segment rules in priority order; the first matching rule wins (same order as the original row-wise rules)
+        segment_rules = [
+            ('Champions', (m == m_max) & (f == f_max) & (r == r_max)), # 1. Best in all 3 dimensions
+            ('High Value Customers', (m == m_max) & ((f == f_max) | (r == r_max))), # 2. High spenders, frequent OR recent
+            ('Loyal Customers', f == f_max), # 3. Frequent buyers (but not high spenders)
+            ('Recent High Spenders', (r == r_max) & (rfm['Monetary'] >= m_median_value)), # 4. Recent + decent spending
+            ('At Risk - High Value', (m == m_max) & (r == r_min)), # 5. High spenders who haven't purchased recently
+            ('At Risk', r == r_min) # 6. Haven't purchased recently (not high spenders)
+        ]
 
         logger.debug("Applying segmentation logic to all customers...")
-        rfm['Segment'] = rfm.apply(segment_customers, axis=1)  # Apply segmentation
+        rfm['Segment'] = np.select(
+            [condition.to_numpy(dtype=bool) for _, condition in segment_rules],
+            [segment for segment, _ in segment_rules],
+            default='Need Attention' # 7. Everyone else (moderate on all dimensions)
+        ).astype(object)
 
         # Log segment distribution with details
         segment_counts = rfm['Segment'].value_counts().to_dict()
         logger.debug(f"Segment distribution: {segment_counts}")
 
-        # Log summary statistics per segment
-        for segment in ['Champions', 'High Value Customers', 'Loyal Customers', 'Recent High Spenders', 'At Risk - High Value', 'At Risk', 'Need Attention']:
-            if segment in segment_counts:
-                seg_data = rfm[rfm['Segment'] == segment]
-                logger.debug(f"{segment}: {segment_counts[segment]} customers, "
-                           f"Avg Monetary: {seg_data['Monetary'].mean():.0f}, "
-                           f"Avg Frequency: {seg_data['Frequency'].mean():.1f}, "
-                           f"Avg Recency: {seg_data['Recency'].mean():.1f} days")
+        # Summary statistics per segment from a single grouped pass
+        segment_summary = rfm.groupby('Segment').agg(
+            customers=('Monetary', 'size'),
+            monetary=('Monetary', 'sum'),
+            avg_monetary=('Monetary', 'mean'),
+            avg_frequency=('Frequency', 'mean'),
+            avg_recency=('Recency', 'mean')
+        )
+        for segment, stats_row in segment_summary.iterrows():
+            logger.debug(f"{segment}: {stats_row['customers']:.0f} customers, "
+                       f"Avg Monetary: {stats_row['avg_monetary']:.0f}, "
+                       f"Avg Frequency: {stats_row['avg_frequency']:.1f}, "
+                       f"Avg Recency: {stats_row['avg_recency']:.1f} days")
 
         logger.info(f"RFM segmentation completed: {len(rfm)} customers across {len(segment_counts)} segments")
 
@@ -248,7 +389,7 @@ class AdvancedAnalytics:
 
         return {
             'segments': segment_counts,
-            'segment_revenue': rfm.groupby('Segment')['Monetary'].sum().to_dict(),
+            'segment_revenue': segment_summary['monetary'].to_dict(),
             'total_customers': len(rfm),
             'avg_recency': rfm['Recency'].mean(),
             'avg_frequency': rfm['Frequency'].mean(),
@@ -257,10 +398,11 @@ class AdvancedAnalytics:
 
     def _segment_by_transaction_patterns(self) -> Dict:
         """Segment based on transaction patterns when no customer data"""
-        trans_analysis = self.analyzer.data.groupby(self.analyzer.config['transaction_col']).agg({
-            self.analyzer.config['revenue_col']: 'sum', # Total revenue per transaction
-            self.analyzer.config['product_col']: 'count', # Number of items per transaction
-            self.analyzer.config['date_col']: 'first' # First transaction date
+        # Revenue, item count and first date per transaction from the shared basket table
+        trans_analysis = self.analyzer.baskets.table.rename(columns={
+            'total': self.analyzer.config['revenue_col'],
+            'items': self.analyzer.config['product_col'],
+            'timestamp': self.analyzer.config['date_col']
         })
 
         # Categorize transactions
@@ -278,14 +420,44 @@ class AdvancedAnalytics:
             'avg_items_per_transaction': trans_analysis[self.analyzer.config['product_col']].mean() # Average items per transaction
         }
 
+    def calculate_cohort_analysis(self) -> Dict:
+        """
+        Monthly customer cohorts: retention matrix, cumulative revenue per customer and historical CLV
+
+        Returns:
+            Dict with retention (% of cohort active k months later), revenue_per_customer (cumulative),
+            cohort_sizes, customers (per-customer CLV table, highest revenue first) and summary averages
+        """
+        customer_col = self.analyzer.config.get('customer_col')
+        if self.analyzer.data is None or customer_col not in self.analyzer.data.columns:
+            return {'error': 'No customer data available for cohort analysis'}
+
+        logger.debug("Building customer cohorts...")
+        cohorts = CohortAnalysis(self.analyzer.data, self.analyzer.config)
+        retention = cohorts.retention
+        customers = cohorts.customers.sort_values('revenue', ascending=False)
+
+        # Retention after k months, weighted by the cohorts that have reached k months
+        observed_sizes = retention.notna().mul(cohorts.cohort_sizes, axis=0)
+        weighted_retention = (cohorts.active_customers.sum() / observed_sizes.sum() * 100).dropna()
+
+        self.cohort_analysis = {
+            'retention': retention,
+            'revenue_per_customer': cohorts.revenue_per_customer,
+            'cohort_sizes': cohorts.cohort_sizes,
+            'customers': customers,
+            'avg_retention': weighted_retention,
+            'avg_clv': customers['revenue'].mean(),
+            'avg_clv_monthly': customers['clv_monthly'].mean()
+        }
+        return self.cohort_analysis
+
     def calculate_anomalies(self, limit: int = 3) -> List[Dict]:
         """Detect anomalies in sales patterns"""
         anomalies = []
 
         # Daily revenue anomalies
-        daily_revenue = self.analyzer.data.groupby(
-            pd.Grouper(key=self.analyzer.config['date_col'], freq='D')
-        )[self.analyzer.config['revenue_col']].sum()
+        daily_revenue = self.analyzer.cube.daily(['revenue'])['revenue']
 
         if len(daily_revenue) > 3:
             # Calculate z-scores
@@ -305,21 +477,82 @@ class AdvancedAnalytics:
                     break
 
         if len(anomalies) < limit:
-            # Product price anomalies
-            product_prices = self.analyzer.data.groupby(self.analyzer.config['product_col'])[self.analyzer.config['revenue_col']].agg(['mean', 'std'])
-            for product in product_prices.index[:50]:
-                product_data = self.analyzer.data[self.analyzer.data[self.analyzer.config['product_col']] == product]
-                if len(product_data) > 5:
-                    prices = product_data[self.analyzer.config['revenue_col']] / product_data[self.analyzer.config['quantity_col']]
-                    z_scores = np.abs(stats.zscore(prices.dropna()))
-                    if (z_scores > 3).any():
-                        anomalies.append({
-                            'type': 'price_anomaly',
-                            'product': product,
-                            'severity': 'medium',
-                            'description': f'Unusual pricing detected for product {product}'
-                        })
+            # Product price anomalies, most severe first
+            anomalies.extend(self.calculate_price_anomalies(limit=limit - len(anomalies)))
+
+        return anomalies
 
+    def calculate_price_anomalies(self, limit: int = 3, threshold: float = 3.0, min_lines: int = 6,
+                                  robust: bool = False, max_transactions: int = 5) -> List[Dict]:
+        """
+        Detect unusual unit prices for every product in one grouped pass
+
+        Args:
+            limit: Maximum number of products to report
+            threshold: Score above which a line's unit price is anomalous
+            min_lines: Products with fewer priced lines are skipped
+            robust: Score with median/MAD instead of mean/std (less sensitive to the outliers themselves)
+            max_transactions: Number of offending transaction IDs to list per product
+
+        Returns:
+            List of price anomalies ranked by their highest score, with the offending transaction IDs
+        """
+        if self.analyzer.data is None:
+            return []
+
+        product_col = self.analyzer.config['product_col']
+        transaction_col = self.analyzer.config['transaction_col']
+        data = self.analyzer.data
+
+        # Unit price per line; lines without a usable quantity are left out
+        unit_price = (data[self.analyzer.config['revenue_col']] / data[self.analyzer.config['quantity_col']]).replace([np.inf, -np.inf], np.nan)
+        grouped = unit_price.groupby(data[product_col], observed=True)
+        lines = grouped.transform('count')
+        if robust:
+            center = grouped.transform('median')
+            spread = (unit_price - center).abs().groupby(data[product_col], observed=True).transform('median') / 0.6745 # MAD scaled to a std
+        else:
+            center = grouped.transform('mean')
+            spread = grouped.transform('std', ddof=0) # Population std, as stats.zscore
+        scores = ((unit_price - center).abs() / spread.where(spread > 0)).where(lines >= min_lines)
+
+        flagged = scores > threshold
+        if not flagged.any():
+            return []
+
+        # One entry per product: highest score, number of flagged lines and the worst transactions
+        offending = pd.DataFrame({
+            'product': data.loc[flagged, product_col].to_numpy(),
+            'transaction': data.loc[flagged, transaction_col].to_numpy(),
+            'score': scores[flagged].to_numpy(),
+            'unit_price': unit_price[flagged].to_numpy(),
+            'typical_price': center[flagged].to_numpy()
+        }).sort_values('score', ascending=False, kind='stable')
+        by_product = offending.groupby('product', sort=False, observed=True)
+        summary = by_product.agg(score=('score', 'max'), lines=('score', 'size'), typical_price=('typical_price', 'first'))
+        summary = summary.sort_values(['score', 'lines'], ascending=False).head(limit)
+        # Worst transactions of the reported products only, already sorted by score
+        reported = offending[offending['product'].isin(summary.index)]
+        worst_transactions = (reported.groupby('product', sort=False, observed=True).head(max_transactions)
+                              .groupby('product', sort=False, observed=True)['transaction'].agg(list))
+
+        names = self.analyzer.product_names(summary.index)
+        anomalies = []
+        for (product, row), name in zip(summary.iterrows(), names):
+            anomalies.append({
+                'type': 'price_anomaly',
+                'product': product,
+                'product_name': name,
+                'score': row['score'],
+                'lines': int(row['lines']),
+                'transactions': worst_transactions[product],
+                'severity': 'high' if row['score'] > 2 * threshold else 'medium',
+                'description': f'Unusual pricing for {str(name)[:30]}: {int(row["lines"])} line(s) up to {row["score"]:.1f}σ '
+                               f'from its usual {self.analyzer.format_currency(row["typical_price"])} '
+                               f'(e.g. {", ".join(str(t) for t in worst_transactions[product][:3])})'
+            })
+
+        logger.debug(f"Price anomalies: {int(flagged.sum())} lines flagged across {by_product.ngroups} products")
         return anomalies
 
     def calculate_recommendations(self) -> List[Dict]:
@@ -333,6 +566,7 @@ class AdvancedAnalytics:
         inventory = self.analyzer.get_inventory_health()
         forecast = self.calculate_revenue_forecast()
         cross_sell = self.calculate_cross_sell_opportunities()
+        bundles = self.calculate_bundle_opportunities()
 
         # Revenue concentration recommendation
         if pareto['revenue_from_top_pct'] > 80:
@@ -377,6 +611,26 @@ class AdvancedAnalytics:
                 'timeframe': bundle_timeframe
             })
 
+        # Multi-product bundles (3-4 items) from frequent itemsets
+        if bundles:
+            top_bundle = bundles[0]
+            bundle_products = ' + '.join(p[:25] for p in top_bundle['products'])
+            bundle_title = 'Create Multi-Product Bundles' if lang == 'ENG' else 'Crear Paquetes Multiproducto'
+            bundle_desc = f"{top_bundle['size']} products bought together in {top_bundle['support']:.1f}% of transactions: {bundle_products}" if lang == 'ENG' else f"{top_bundle['size']} productos comprados juntos en {top_bundle['support']:.1f}% de las transacciones: {bundle_products}"
+            bundle_action = f"Suggest {' + '.join(p[:25] for p in top_bundle['consequent'])} at checkout ({top_bundle['confidence']:.0f}% of baskets with the rest of the bundle already include it)" if lang == 'ENG' else f"Sugerir {' + '.join(p[:25] for p in top_bundle['consequent'])} al pagar (el {top_bundle['confidence']:.0f}% de las compras con el resto del paquete ya lo incluye)"
+            bundle_impact = 'Increase items per transaction' if lang == 'ENG' else 'Aumentar productos por transacción'
+            bundle_timeframe = '1 month' if lang == 'ENG' else '1 mes'
+
+            recommendations.append({
+                'priority': get_text('priority_medium', lang),
+                'category': 'Revenue Growth',
+                'title': bundle_title,
+                'description': bundle_desc,
+                'action': bundle_action,
+                'expected_impact': bundle_impact,
+                'timeframe': bundle_timeframe
+            })
+
         # Trend-based recommendation
         if forecast.get('trend') == 'decreasing':
             recommendations.append({
@@ -419,6 +673,67 @@ class AdvancedAnalytics:
 
         return "\n".join(forecast_str)
 
+    def print_cohort_analysis(self, max_months: int = 3) -> str:
+        """Format cohort sizes, retention and CLV as string"""
+
+        lang = self.analyzer.config.get('language', 'ENG')
+        cohorts = self.calculate_cohort_analysis()
+
+        if 'error' in cohorts:
+            return f"ℹ️ {cohorts['error']}"
+
+        retention = cohorts['retention']
+        months = [m for m in range(1, max_months + 1) if m in retention.columns]
+
+        output = []
+        output.append("=" * 60)
+        output.append(get_text('cohort_analysis_title', lang))
+        output.append("=" * 60)
+        for cohort, size in cohorts['cohort_sizes'].items():
+            values = [f"M{m}: {retention.loc[cohort, m]:.1f}%" for m in months if pd.notna(retention.loc[cohort, m])]
+            output.append(f"  • {cohort}: {size} {get_text('new_customers', lang)}" + (f" | {' | '.join(values)}" if values else ""))
+
+        output.append("")
+        for m in months:
+            if m in cohorts['avg_retention'].index:
+                output.append(f"{get_text('retention_after_months', lang, months=m)}: {cohorts['avg_retention'][m]:.1f}%")
+        output.append(f"{get_text('avg_historical_clv', lang)}: {self.analyzer.format_currency(cohorts['avg_clv'])}")
+        output.append(f"{get_text('avg_monthly_value', lang)}: {self.analyzer.format_currency(cohorts['avg_clv_monthly'])}")
+
+        return '\n'.join(output)
+
+    def export_cohort_analysis(self, save: bool = True) -> List[str]:
+        """
+        Export the retention matrix, revenue curves and per-customer CLV as CSV files
+
+        Args:
+            save: Write the files (False only returns the paths they would have)
+
+        Returns:
+            List of file paths
+        """
+        cohorts = self.cohort_analysis or self.calculate_cohort_analysis()
+        if 'error' in cohorts:
+            logger.warning(cohorts['error'])
+            return []
+
+        lang = self.analyzer.config.get('language', 'ENG')
+        tables = {
+            'cohort_retention': cohorts['retention'].round(2),
+            'cohort_revenue': cohorts['revenue_per_customer'].round(2),
+            'customer_clv': cohorts['customers']
+        }
+
+        paths = []
+        for suffix_key, table in tables.items():
+            save_path = os.path.join(self.analyzer.out_dir, get_filename('AV', suffix_key, lang, 'csv'))
+            if save:
+                os.makedirs(os.path.dirname(save_path), exist_ok=True)
+                table.to_csv(save_path)
+                print(f"✅ Exported to {save_path}")
+            paths.append(save_path)
+        return paths
+
     def print_cross_sell_opportunities(self, min_support: float = 0.01, limit: int = 3) -> str:
         """Format cross-sell opportunities as string"""
 
@@ -531,49 +846,42 @@ class AdvancedAnalytics:
 
         # Only aggregate if we have metadata columns
         if agg_dict:
-            customer_meta = self.analyzer.data.groupby(customer_col).agg(agg_dict)
+            customer_meta = self.analyzer.data.groupby(customer_col, observed=True).agg(agg_dict)
 
-        # Prepare detailed segments
+        # Sort once (Recency ascending = most recent first, then Frequency and Monetary descending);
+        # the stable grouped head keeps that order inside each segment
+        ranked = self.rfm_data.sort_values(
+            by=['Recency', 'Frequency', 'Monetary'],
+            ascending=[True, False, False]
+        )
+        top_customers = ranked.groupby('Segment', sort=False, observed=True).head(top_n)
+        segment_counts = self.rfm_data['Segment'].value_counts()
+
+        columns = {
+            'Recency': 'recency',
+            'Frequency': 'frequency',
+            'Monetary': 'monetary',
+            'Recency_Quartile': 'recency_quartile',
+            'Frequency_Quartile': 'frequency_quartile',
+            'Monetary_Quartile': 'monetary_quartile'
+        }
+        top_customers = top_customers[['Segment'] + list(columns)].rename(columns=columns)
+        for quartile in ['recency_quartile', 'frequency_quartile', 'monetary_quartile']:
+            top_customers[quartile] = top_customers[quartile].astype(str)
+
+        # Customer metadata joined in one merge
+        if not customer_meta.empty:
+            meta = customer_meta.rename(columns={'customer_name': 'name', 'customer_location': 'location'})
+            top_customers = top_customers.merge(meta, how='left', left_index=True, right_index=True)
+        top_customers.index.name = 'customer_id'
+        top_customers = top_customers.reset_index()
+
+        # Same structure as before: segment -> total count and list of customer dicts
         detailed_segments = {}
-
         for segment in self.rfm_data['Segment'].unique():
-            segment_customers = self.rfm_data[self.rfm_data['Segment'] == segment].copy() # Copy to avoid modifying original data
-
-            # Sort by composite RFM score (Recency ascending=best is lowest days, Frequency & Monetary descending)
-            # Priority: Recency first (most recent), then Frequency, then Monetary
-            segment_customers = segment_customers.sort_values(
-                by=['Recency', 'Frequency', 'Monetary'],
-                ascending=[True, False, False]
-            )
-
-            # Get top N customers
-            top_customers = segment_customers.head(top_n)
-
-            customers_list = []
-            for customer_id, row in top_customers.iterrows():
-                customer_info = {
-                    'customer_id': customer_id,
-                    'recency': row['Recency'],
-                    'frequency': row['Frequency'],
-                    'monetary': row['Monetary'],
-                    'recency_quartile': str(row['Recency_Quartile']),
-                    'frequency_quartile': str(row['Frequency_Quartile']),
-                    'monetary_quartile': str(row['Monetary_Quartile'])
-                }
-
-                # Add customer metadata if available
-                if not customer_meta.empty and customer_id in customer_meta.index:
-                    if 'customer_name' in customer_meta.columns:
-                        customer_info['name'] = customer_meta.loc[customer_id, 'customer_name']
-                    if 'customer_location' in customer_meta.columns:
-                        customer_info['location'] = customer_meta.loc[customer_id, 'customer_location']
-
-                customers_list.append(customer_info)
-
-            detailed_segments[segment] = {
-                'total_count': len(segment_customers),
-                'top_customers': customers_list
-            }
+            detailed_segments[segment] = {'total_count': int(segment_counts[segment]), 'top_customers': []}
+        for segment, customers in top_customers.groupby('Segment', sort=False, observed=True):
+            detailed_segments[segment]['top_customers'] = customers.drop(columns='Segment').to_dict('records')
 
         return detailed_segments
 
@@ -721,10 +1029,14 @@ class AdvancedAnalytics:
 
     # VISUALIZATION METHODS
 
-    def create_trend_analysis(self, figsize=(15, 10)) -> plt.Figure:
+    def create_trend_analysis(self, figsize=(15, 10), top_n: int = 5) -> plt.Figure:
         """
         Create comprehensive trend analysis visualization
 
+        Args:
+            figsize: Figure size
+            top_n: Number of top products in the weekly product mix panel
+
         Returns:
             matplotlib.figure.Figure: The generated trend analysis figure
 
@@ -737,11 +1049,11 @@ class AdvancedAnalytics:
         fig, axes = plt.subplots(2, 2, figsize=figsize)
         fig.suptitle(get_text('trend_analysis_title', lang), fontsize=16, fontweight='bold')
 
+        cube = self.trend_cube
+
         # 1. Revenue Trend
         ax1 = axes[0, 0]
-        daily_revenue = self.analyzer.data.groupby(
-            pd.Grouper(key=self.analyzer.config['date_col'], freq='D')
-        )[self.analyzer.config['revenue_col']].sum()
+        daily_revenue = cube['daily']['revenue']
 
         ax1.plot(daily_revenue.index, daily_revenue.values, color='#2E86AB', linewidth=1, alpha=0.5)
         ax1.plot(daily_revenue.index, daily_revenue.rolling(7).mean(), color='#D62828', linewidth=2, label=get_text('moving_average_7d', lang))
@@ -754,9 +1066,7 @@ class AdvancedAnalytics:
 
         # 2. Transaction Volume
         ax2 = axes[0, 1]
-        daily_trans = self.analyzer.data.groupby(
-            pd.Grouper(key=self.analyzer.config['date_col'], freq='D')
-        )[self.analyzer.config['transaction_col']].nunique()
+        daily_trans = cube['daily']['transactions']
 
         ax2.bar(daily_trans.index, daily_trans.values, color='#52B788', alpha=0.7)
         ax2.set_title(get_text('daily_transactions_title', lang), fontweight='bold')
@@ -766,31 +1076,26 @@ class AdvancedAnalytics:
 
         # 3. Product Mix Evolution
         ax3 = axes[1, 0]
-        weekly_products = self.analyzer.data.groupby(
-            [pd.Grouper(key=self.analyzer.config['date_col'], freq='W'), self.analyzer.config['product_col']]
-        )[self.analyzer.config['revenue_col']].sum().reset_index()
-
-        top_products = self.analyzer.product_analysis.head(5).index
-        for product in top_products:
-            product_data = weekly_products[weekly_products[self.analyzer.config['product_col']] == product]
-            if len(product_data) > 0:
-                label = self.analyzer.data[self.analyzer.data[self.analyzer.config['product_col']] == product][
-                    self.analyzer.config['description_col']
-                ].iloc[0][:20] + '...'
-                ax3.plot(product_data[self.analyzer.config['date_col']],
-                        product_data[self.analyzer.config['revenue_col']],
-                        marker='o', label=label, linewidth=2)
-
-        ax3.set_title(get_text('top_products_weekly', lang), fontweight='bold')
+        weekly_products = cube['weekly_products']
+
+        top_products = self.analyzer.product_analysis.head(top_n).index
+        top_products = top_products[top_products.isin(weekly_products.columns)]
+        names = self.analyzer.product_names(top_products)
+        for product, name in zip(top_products, names):
+            product_data = weekly_products[product].dropna() # Weeks in which the product sold
+            label = str(name)[:20] + '...'
+            ax3.plot(product_data.index, product_data.values, marker='o', label=label, linewidth=2)
+
+        ax3.set_title(get_text('top_products_weekly', lang, n=len(top_products)), fontweight='bold')
         ax3.set_xlabel(get_text('week_label', lang))
         ax3.set_ylabel(get_text('revenue_label', lang))
-        ax3.legend(fontsize=8)
+        ax3.legend(fontsize=8, ncol=2 if len(top_products) > 10 else 1)
         ax3.grid(True, alpha=0.3)
 
         # 4. Day of Week Pattern
         ax4 = axes[1, 1]
-        if 'weekday' in self.analyzer.data.columns:
-            dow_revenue = self.analyzer.data.groupby('weekday')[self.analyzer.config['revenue_col']].mean()
+        if len(cube['weekday']) > 0:
+            dow_revenue = cube['weekday']
             day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
             dow_revenue = dow_revenue.reindex(day_order, fill_value=0)
 
@@ -809,3 +1114,35 @@ class AdvancedAnalytics:
 
         self.trend_analysis = fig
         return fig
+
+    def create_cohort_heatmap(self, figsize=(12, 8), max_months: int = 12) -> plt.Figure:
+        """
+        Create the cohort retention heatmap
+
+        Args:
+            figsize: Figure size
+            max_months: Months since first purchase to show
+
+        Returns:
+            matplotlib.figure.Figure: The generated heatmap figure
+        """
+        lang = self.analyzer.config.get('language', 'ENG')
+        cohorts = self.cohort_analysis or self.calculate_cohort_analysis()
+
+        fig, ax = plt.subplots(figsize=figsize)
+        if 'error' in cohorts:
+            ax.text(0.5, 0.5, cohorts['error'], ha='center', va='center', transform=ax.transAxes)
+            ax.axis('off')
+            return fig
+
+        retention = cohorts['retention'].iloc[:, :max_months + 1]
+        retention.index = retention.index.astype(str)
+        sns.heatmap(retention, annot=True, fmt='.0f', cmap='YlGnBu', vmin=0, vmax=100,
+                    cbar_kws={'label': '%'}, linewidths=0.5, ax=ax) # Empty cells: months not reached yet
+        ax.set_title(get_text('cohort_retention_title', lang), fontsize=14, fontweight='bold')
+        ax.set_xlabel(get_text('months_since_first_label', lang))
+        ax.set_ylabel(get_text('cohort_month_label', lang))
+        plt.tight_layout()
+
+        self.cohort_heatmap = fig
+        return fig
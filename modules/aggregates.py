@@ -0,0 +1,274 @@
+"""
+Aggregates Module
+Partial aggregates that can be folded chunk by chunk, so base metrics can be
+built without holding every transaction line in memory at once.
+Each fold is a single factorize-and-reduce pass (bincount / ufunc.at over codes).
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict
+import warnings
+warnings.filterwarnings('ignore')
+
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+
+class MetricAggregates:
+    """
+    Running per-product, per-transaction and per-time aggregates.
+    Each call to update() folds one chunk of prepared rows into the totals.
+    """
+
+    def __init__(self, config: Dict):
+        """
+        Initialize empty aggregates
+
+        Args:
+            config: Configuration dictionary with the column mapping
+        """
+        self.config = config
+
+        self.products = None  # Per product: description, revenue, quantity, line count, last and first sale (+ category, cost)
+        self.transactions = None  # Distinct transaction ids seen so far (array, then set once merged)
+        self.timestamp_revenue = pd.Series(dtype='float64')  # Revenue per distinct timestamp (few per day)
+        self.hourly_revenue = pd.Series(dtype='float64')  # Revenue per hour of day
+        self.weekday_revenue = pd.Series(dtype='float64')  # Revenue per weekday name
+        self.timestamp_cost = pd.Series(dtype='float64')  # Cost of goods sold per distinct timestamp (when cost_col is present)
+        self.total_revenue = 0
+        self.total_cost = 0
+        self.has_cost = False  # Whether the folded rows carried cost_col
+        self.rows = 0
+        self.min_date = None
+        self.max_date = None
+
+    def update(self, chunk: pd.DataFrame):
+        """Fold a prepared chunk of transaction lines into the aggregates"""
+        if chunk is None or len(chunk) == 0:
+            return
+
+        date_col = self.config['date_col']
+        product_col = self.config['product_col']
+        description_col = self.config['description_col']
+        revenue_col = self.config['revenue_col']
+        quantity_col = self.config['quantity_col']
+        transaction_col = self.config['transaction_col']
+        category_col = self.config.get('category_col')
+        cost_col = self.config.get('cost_col')
+        has_cost = bool(cost_col) and cost_col in chunk.columns
+
+        # One factorize of the product column; every per-product aggregate is a reduction over its codes
+        codes, products = pd.factorize(chunk[product_col])
+        n_products = len(products)
+        valid = codes >= 0
+        product_codes = codes[valid]
+
+        # Transaction codes give both the per-product line count and the distinct transactions
+        transaction_codes, transaction_ids = pd.factorize(chunk[transaction_col])
+
+        revenue = chunk[revenue_col].to_numpy()[valid]
+        quantity = chunk[quantity_col].to_numpy()[valid]
+        has_transaction = transaction_codes[valid] >= 0
+        dates = chunk[date_col].to_numpy(dtype='datetime64[ns]')[valid].view('int64')  # NaT is the smallest int64
+
+        last_sale = np.full(n_products, np.iinfo(np.int64).min, dtype='int64')
+        np.maximum.at(last_sale, product_codes, dates)
+        first_sale = np.full(n_products, np.iinfo(np.int64).max, dtype='int64')
+        np.minimum.at(first_sale, product_codes, np.where(dates == np.iinfo(np.int64).min, np.iinfo(np.int64).max, dates))
+        first_sale[first_sale == np.iinfo(np.int64).max] = np.iinfo(np.int64).min  # Products with no valid date
+
+        columns = {
+            description_col: first_valid(product_codes, chunk[description_col].to_numpy()[valid], n_products), # First description
+            revenue_col: _bincount(product_codes, revenue, n_products), # Revenue
+            quantity_col: _bincount(product_codes, quantity, n_products), # Quantity sold
+            transaction_col: np.bincount(product_codes[has_transaction], minlength=n_products), # Number of lines
+            date_col: last_sale.view('datetime64[ns]'), # Last sale date
+            'first_sale': first_sale.view('datetime64[ns]') # First sale date
+        }
+        merge = {
+            description_col: 'first', # Keep the description seen first
+            revenue_col: 'sum',
+            quantity_col: 'sum',
+            transaction_col: 'sum',
+            date_col: 'max',
+            'first_sale': 'min'
+        }
+        if category_col and category_col in chunk.columns:
+            columns[category_col] = first_valid(product_codes, chunk[category_col].to_numpy()[valid], n_products)
+            merge[category_col] = 'first'
+        if has_cost:
+            cost = line_cost(chunk, self.config)
+            columns[cost_col] = _bincount(product_codes, cost[valid], n_products) # Cost of goods sold
+            merge[cost_col] = 'sum'
+
+        partial = pd.DataFrame(columns, index=pd.Index(products, name=product_col)).sort_index()
+
+        if self.products is None:
+            self.products = partial
+        else:
+            self.products = _fold_products(self.products, partial, merge)
+
+        # Transaction ids may span chunk boundaries. A single fold keeps the distinct ids as an
+        # array; they become a set only once a second chunk (or an append) has to be merged.
+        transaction_ids = np.asarray(transaction_ids)
+        if self.transactions is None:
+            self.transactions = transaction_ids
+        else:
+            if not isinstance(self.transactions, set):
+                self.transactions = set(self.transactions)
+            self.transactions.update(transaction_ids)
+
+        # Time series partials
+        revenue_values = chunk[revenue_col].to_numpy()
+        self.timestamp_revenue = _accumulate(self.timestamp_revenue, _sum_by(chunk[date_col], revenue_values))
+        if 'hour' in chunk.columns:
+            self.hourly_revenue = _accumulate(self.hourly_revenue, _sum_by(chunk['hour'], revenue_values))
+        if 'weekday' in chunk.columns:
+            self.weekday_revenue = _accumulate(self.weekday_revenue, _sum_by(chunk['weekday'], revenue_values))
+
+        if has_cost:
+            self.timestamp_cost = _accumulate(self.timestamp_cost, _sum_by(chunk[date_col], cost))
+            self.total_cost += cost.sum()
+            self.has_cost = True
+
+        self.total_revenue += chunk[revenue_col].sum()
+        self.rows += len(chunk)
+
+        chunk_min = chunk[date_col].min()
+        chunk_max = chunk[date_col].max()
+        self.min_date = chunk_min if self.min_date is None or chunk_min < self.min_date else self.min_date
+        self.max_date = chunk_max if self.max_date is None or chunk_max > self.max_date else self.max_date
+
+        logger.debug(f"Folded chunk of {len(chunk):,} rows ({self.rows:,} total, {len(self.products)} products)")
+
+    @property
+    def transaction_count(self) -> int:
+        """Number of distinct transactions folded so far"""
+        return len(self.transactions) if self.transactions is not None else 0
+
+    @property
+    def daily_revenue(self) -> pd.Series:
+        """Revenue per calendar day"""
+        return self.timestamp_revenue.groupby(self.timestamp_revenue.index.normalize()).sum()
+
+    @property
+    def daily_cost(self) -> pd.Series:
+        """Cost of goods sold per calendar day"""
+        return self.timestamp_cost.groupby(self.timestamp_cost.index.normalize()).sum()
+
+    def product_totals(self) -> pd.DataFrame:
+        """Per-product totals laid out like the product groupby in BusinessAnalyzer"""
+        columns = [self.config['description_col'], self.config['revenue_col'],
+                   self.config['quantity_col'], self.config['transaction_col']]
+        return self.products[columns]
+
+    def product_costs(self) -> pd.DataFrame:
+        """Per-product description, revenue and cost of goods sold (requires cost_col in the folded rows)"""
+        columns = [self.config['description_col'], self.config['revenue_col'], self.config['cost_col']]
+        return self.products[columns]
+
+    def product_dimension(self) -> pd.DataFrame:
+        """Per-product description, first and last sale (and category when configured), indexed by product"""
+        dimension = self.products.rename(columns={self.config['date_col']: 'last_sale'})
+        columns = [self.config['description_col'], 'first_sale', 'last_sale']
+        category_col = self.config.get('category_col')
+        if category_col and category_col in dimension.columns:
+            columns.append(category_col)
+        return dimension[columns]
+
+    def last_sales(self) -> pd.DataFrame:
+        """Per-product last sale date laid out like the inventory groupby in BusinessAnalyzer"""
+        columns = [self.config['date_col'], self.config['description_col']]
+        return self.products[columns].reset_index()
+
+
+def _accumulate(current: pd.Series, partial: pd.Series) -> pd.Series:
+    """
+    Add a partial series into a running one, keeping integer dtypes (Series.add would upcast to float).
+    Both are sorted by key, so the partial keys are found by binary search: an append costs time
+    proportional to its own keys (plus one copy of the values), not a regroup of the whole history.
+    """
+    if len(current) == 0:
+        return partial
+    if not current.index.is_monotonic_increasing or isinstance(current.index, pd.CategoricalIndex):
+        return pd.concat([current, partial]).groupby(level=0).sum()
+
+    keys = current.index.to_numpy()
+    partial_keys = partial.index.to_numpy()
+    positions = np.searchsorted(keys, partial_keys)
+    found = positions < len(keys)
+    found[found] = keys[positions[found]] == partial_keys[found]
+
+    # Keys already present: added into a copy of the running values
+    values = current.to_numpy().astype(np.result_type(current.dtype, partial.dtype))
+    values[positions[found]] += partial.to_numpy()[found]
+    merged = pd.Series(values, index=current.index, name=current.name)
+    if found.all():
+        return merged
+
+    # New keys: appended, re-sorted only when they fall inside the existing range (e.g. late data)
+    added = partial[~found]
+    merged = pd.concat([merged, added])
+    return merged if added.index[0] > keys[-1] else merged.sort_index()
+
+
+def _fold_products(current: pd.DataFrame, partial: pd.DataFrame, merge: Dict) -> pd.DataFrame:
+    """
+    Fold per-product partial rows into the running table. Only the products of the partial are
+    regrouped with their running rows; every other product is carried over as is.
+    """
+    positions = current.index.get_indexer(partial.index)
+    seen = positions[positions >= 0]
+    folded = pd.concat([current.iloc[seen], partial]).groupby(level=0, observed=True).agg(merge) if len(seen) > 0 else partial
+    kept = np.ones(len(current), dtype=bool)
+    kept[seen] = False
+    return pd.concat([current[kept], folded]).sort_index()
+
+
+def first_valid(codes: np.ndarray, values: np.ndarray, length: int) -> np.ndarray:
+    """First non-missing value per code (what groupby 'first' returns)"""
+    present = np.asarray(pd.notna(values))
+    first_row = np.full(length, len(values), dtype='int64')
+    np.minimum.at(first_row, codes[present], np.flatnonzero(present))
+
+    missing = first_row == len(values)
+    if not missing.any():
+        return values[first_row]
+    # Codes with no value at all become missing (NaN / NaT, upcast as pandas does)
+    return pd.Series(values[np.where(missing, 0, first_row)]).where(~missing).to_numpy()
+
+
+def line_cost(frame: pd.DataFrame, config: Dict) -> np.ndarray:
+    """
+    Cost of goods sold per line: cost_col times quantity_col (cost_col as is when 'cost_per_unit' is False).
+    Integer columns (possibly downcast in compact mode) are multiplied as int64 so they cannot overflow;
+    lines without a cost count as zero cost.
+    """
+    cost = frame[config['cost_col']].to_numpy()
+    if config.get('cost_per_unit', True):
+        quantity = frame[config['quantity_col']].to_numpy()
+        if np.issubdtype(cost.dtype, np.integer) and np.issubdtype(quantity.dtype, np.integer):
+            return cost.astype('int64') * quantity.astype('int64')
+        cost = cost.astype('float64') * quantity.astype('float64')
+    if np.issubdtype(cost.dtype, np.integer):
+        return cost.astype('int64')
+    return np.nan_to_num(cost.astype('float64'))
+
+
+def _bincount(codes: np.ndarray, values: np.ndarray, length: int) -> np.ndarray:
+    """Sum values per code, returning int64 when the values are integers (exact below 2**53)"""
+    sums = np.bincount(codes, weights=values, minlength=length)
+    if np.issubdtype(values.dtype, np.integer):
+        return sums.astype('int64')
+    return sums
+
+
+def _sum_by(keys: pd.Series, values: np.ndarray) -> pd.Series:
+    """Sum values per distinct key, sorted by key like groupby().sum()"""
+    codes, uniques = pd.factorize(keys, sort=True)
+    valid = codes >= 0
+    sums = _bincount(codes[valid], values[valid], len(uniques))
+    return pd.Series(sums, index=pd.Index(uniques, name=keys.name))
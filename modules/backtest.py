@@ -0,0 +1,166 @@
+"""
+Backtest Module
+Rolling-origin backtesting of daily forecasts: every fold cuts one precomputed daily series
+at a cutoff date, forecasts the following days and scores them against what actually happened
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.forecasting import FORECAST_METHODS
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+# Daily series shared by the folds of one worker process (set once by _init_worker)
+_SERIES = None
+
+
+def revenue_forecast_method(history: np.ndarray, horizon: int, window: int = 7) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The model behind calculate_revenue_forecast: flat at the last `window`-day average,
+    with the std of all daily values as the interval width
+
+    Args:
+        history: Daily values up to the cutoff
+        horizon: Days to forecast
+        window: Moving average window in days
+
+    Returns:
+        Tuple of (forecast path, daily std used for the interval)
+    """
+    level = history[-window:].mean() if len(history) else 0.0
+    std_dev = history.std(ddof=1) if len(history) > 1 else 0.0
+    return np.full(horizon, level), np.array(std_dev)
+
+
+def _batched_method(name: str):
+    """Adapt a FORECAST_METHODS model (series x day matrices) to a single daily series"""
+    def method(history: np.ndarray, horizon: int, **params) -> Tuple[np.ndarray, np.ndarray]:
+        path, error_std = FORECAST_METHODS[name](history[None, :], horizon, **params)
+        return path[0], error_std[0]
+    return method
+
+
+# Backtestable methods by name; each takes (history, horizon, **params) and returns (path, daily std)
+BACKTEST_METHODS = {
+    'revenue_forecast': revenue_forecast_method,
+    **{name: _batched_method(name) for name in FORECAST_METHODS}
+}
+
+
+def rolling_cutoffs(days: pd.DatetimeIndex, horizon: int = 30, folds: int = 4, step: int = 7,
+                    min_history: int = 14) -> List[pd.Timestamp]:
+    """
+    Evenly spaced cutoff dates that leave a full horizon of actuals after each one
+
+    Args:
+        days: Dates of the daily series
+        horizon: Days forecast after each cutoff
+        folds: Maximum number of cutoffs
+        step: Days between consecutive cutoffs
+        min_history: Minimum days of history before the first cutoff
+
+    Returns:
+        List of cutoff dates (oldest first); each is the first forecast day of its fold
+    """
+    last = len(days) - horizon  # Latest position that still has `horizon` actual days after it
+    positions = [p for p in range(last, min_history - 1, -step)][:folds]
+    return [days[p] for p in sorted(positions)]
+
+
+def backtest_forecast(series: pd.Series, method: str = 'revenue_forecast', cutoffs: List = None,
+                      horizon: int = 30, z_score: float = 1.96, max_workers: int = None, **params) -> pd.DataFrame:
+    """
+    Score a forecast method on rolling origins, one fold per cutoff, in a process pool
+
+    Args:
+        series: Daily values indexed by consecutive dates (e.g. DemandForecaster.daily_totals())
+        method: Key of BACKTEST_METHODS
+        cutoffs: First forecast day of each fold (defaults to rolling_cutoffs)
+        horizon: Days forecast in each fold
+        z_score: Width of the daily interval (1.96 for 95%)
+        max_workers: Upper bound on worker processes (1 runs the folds in this process)
+        **params: Model parameters (window, alpha, season)
+
+    Returns:
+        DataFrame per fold with cutoff, days, MAE, MAPE, interval coverage and total error;
+        attrs['summary'] holds the averages over the folds
+    """
+    if method not in BACKTEST_METHODS:
+        raise ValueError(f"Unknown forecast method '{method}'. Options: {', '.join(BACKTEST_METHODS)}")
+
+    if cutoffs is None:
+        cutoffs = rolling_cutoffs(series.index, horizon)
+    positions = series.index.get_indexer(pd.to_datetime(cutoffs))
+    if (positions <= 0).any():
+        raise ValueError("Every cutoff must be a date of the series with some history before it")
+
+    values = series.to_numpy(dtype='float64')
+    tasks = [(int(position), horizon, method, z_score, params) for position in positions]
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks)))
+    logger.debug(f"Backtesting '{method}' on {len(tasks)} folds ({horizon} days each) with {workers} workers")
+
+    if workers == 1:
+        _init_worker(values)
+        rows = [_evaluate_fold(task) for task in tasks]
+    else:
+        # The series is sent once per worker, not once per fold
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(values,)) as pool:
+            rows = list(pool.map(_evaluate_fold, tasks))
+
+    for row, position in zip(rows, positions):
+        row['cutoff'] = series.index[position]
+    columns = ['cutoff', 'days', 'mae', 'mape', 'coverage', 'total_forecast', 'total_actual', 'total_error_pct']
+    results = pd.DataFrame(rows, columns=columns)
+
+    results.attrs.update({
+        'method': method,
+        'horizon': horizon,
+        'params': params,
+        'summary': {
+            'folds': len(results),
+            'mae': results['mae'].mean(),
+            'mape': results['mape'].mean(),
+            'coverage': results['coverage'].mean(),
+            'total_error_pct': results['total_error_pct'].abs().mean()
+        }
+    })
+    return results
+
+
+def _init_worker(values: np.ndarray):
+    """Keep the daily series in the worker for all of its folds"""
+    global _SERIES
+    _SERIES = values
+
+
+def _evaluate_fold(task: Tuple) -> Dict:
+    """Forecast from one cutoff and score it against the actual days that follow"""
+    position, horizon, method, z_score, params = task
+    history = _SERIES[:position]
+    actual = _SERIES[position:position + horizon]
+    days = len(actual)
+
+    path, std_dev = BACKTEST_METHODS[method](history, days, **params)
+    path = np.clip(path, 0, None)  # Sales are never negative
+    low = np.clip(path - z_score * std_dev, 0, None)
+    high = path + z_score * std_dev
+
+    errors = actual - path
+    sold = actual != 0  # MAPE is undefined on days without sales
+    total_actual = actual.sum()
+    return {
+        'days': days,
+        'mae': np.abs(errors).mean() if days else np.nan,
+        'mape': (np.abs(errors[sold]) / np.abs(actual[sold])).mean() * 100 if sold.any() else np.nan,
+        'coverage': ((actual >= low) & (actual <= high)).mean() * 100 if days else np.nan,
+        'total_forecast': path.sum(),
+        'total_actual': total_actual,
+        'total_error_pct': (path.sum() - total_actual) / total_actual * 100 if total_actual else np.nan
+    }
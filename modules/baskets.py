@@ -0,0 +1,108 @@
+"""
+Baskets Module
+Transaction (basket) fact table: one row per transaction plus a CSR layout of its products,
+built once from the line items and shared by every module that works per transaction
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing import Dict
+import warnings
+warnings.filterwarnings('ignore')
+
+from modules.aggregates import first_valid
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+
+class TransactionBaskets:
+    """
+    One row per transaction with its total, item count, timestamp and customer.
+    The products of transaction i are items[offsets[i]:offsets[i + 1]], as codes into products.
+    """
+
+    def __init__(self, data: pd.DataFrame, config: Dict):
+        """
+        Build the basket table from prepared line items
+
+        Args:
+            data: Prepared transaction lines
+            config: Configuration dictionary with the column mapping
+        """
+        self.config = config
+        self._incidence = None  # Transaction x product matrix, built on first use
+        self._co_occurrence = None  # Product x product matrix, built on first use
+
+        transaction_col = config['transaction_col']
+        product_col = config['product_col']
+        revenue_col = config['revenue_col']
+        date_col = config['date_col']
+        customer_col = config.get('customer_col')
+
+        # Sorted codes, so transactions come out in the same order as a groupby on transaction_col
+        codes, transaction_ids = pd.factorize(data[transaction_col], sort=True)
+        n_transactions = len(transaction_ids)
+        valid = codes >= 0
+        codes = codes[valid]
+
+        revenue = data[revenue_col].to_numpy()[valid]
+        total = np.bincount(codes, weights=revenue, minlength=n_transactions)
+        if np.issubdtype(revenue.dtype, np.integer):
+            total = total.astype('int64')
+
+        # CSR layout: rows grouped by transaction (stable, so line order is kept inside a basket)
+        product_codes, self.products = pd.factorize(data[product_col], sort=True)
+        product_codes = product_codes[valid]
+        has_product = product_codes >= 0
+        order = np.argsort(codes[has_product], kind='stable')
+        self.items = product_codes[has_product][order].astype('int32')
+        item_count = np.bincount(codes[has_product], minlength=n_transactions)
+        self.offsets = np.zeros(n_transactions + 1, dtype='int64')
+        np.cumsum(item_count, out=self.offsets[1:])
+
+        columns = {
+            'total': total, # Revenue per transaction
+            'items': item_count, # Number of lines with a product
+            'timestamp': first_valid(codes, data[date_col].to_numpy()[valid], n_transactions) # First transaction date
+        }
+        if customer_col and customer_col in data.columns:
+            columns['customer'] = first_valid(codes, data[customer_col].to_numpy()[valid], n_transactions)
+
+        self.table = pd.DataFrame(columns, index=pd.Index(transaction_ids, name=transaction_col))
+        logger.debug(f"Built basket table: {n_transactions:,} transactions, {len(self.items):,} items")
+
+    def __len__(self) -> int:
+        """Number of transactions"""
+        return len(self.table)
+
+    @property
+    def sizes(self) -> np.ndarray:
+        """Number of items in each basket"""
+        return np.diff(self.offsets)
+
+    def basket(self, position: int) -> np.ndarray:
+        """Product codes of the transaction at a position in the table"""
+        return self.items[self.offsets[position]:self.offsets[position + 1]]
+
+    def incidence(self) -> sparse.csr_matrix:
+        """Binary transaction x product matrix (1 if the product is in the basket), built from the CSR layout"""
+        if self._incidence is None:
+            matrix = sparse.csr_matrix(
+                (np.ones(len(self.items), dtype='int32'), self.items, self.offsets),
+                shape=(len(self.table), len(self.products))
+            )
+            matrix.sum_duplicates()  # A product on several lines of a basket counts once
+            matrix.data[:] = 1
+            self._incidence = matrix
+        return self._incidence
+
+    def co_occurrence(self) -> sparse.csr_matrix:
+        """Product x product basket counts (diagonal: baskets containing each product)"""
+        if self._co_occurrence is None:
+            incidence = self.incidence()
+            self._co_occurrence = (incidence.T @ incidence).tocsr()
+        return self._co_occurrence
+
@@ -0,0 +1,265 @@
+"""
+Batch Module
+Runs the full notebook flow for a portfolio of clients in a process pool,
+with per-client timing, failure isolation and one consolidated run summary
+"""
+
+import io
+import os
+import time
+import traceback
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from modules.dates import parse_dates
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+# Client folders under data/ and the file their generator writes
+PORTFOLIO_CLIENTS = [
+    'auto_partes',
+    'bookstore',
+    'cafe_andino',
+    'cerveza_losandes',
+    'comercializadora',
+    'estilo_santiago',
+    'farmacia_salud',
+    'techno_max'
+]
+
+
+def portfolio_configs(base_config: Dict, data_dir: str = 'data', clients: List[str] = None) -> List[Dict]:
+    """
+    Build one client config per dataset in the portfolio
+
+    Args:
+        base_config: Shared settings (column mapping, language, ...). Without an 'analysis_date',
+            each client is analyzed as of the day after its own last sale
+        data_dir: Folder holding one sub-folder per client
+        clients: Client names to include (defaults to PORTFOLIO_CLIENTS)
+
+    Returns:
+        List of configs, each with 'project_name', 'input_file' and 'analysis_date' set for its client
+    """
+    configs = []
+    for client in clients or PORTFOLIO_CLIENTS:
+        config = dict(base_config)
+        config['project_name'] = client
+        config['input_file'] = os.path.join(data_dir, client, f"{client}_transactions.csv")
+        if not config.get('analysis_date'):
+            analysis_date = day_after_data(config['input_file'], config['date_col'])
+            if analysis_date is not None:
+                config['analysis_date'] = analysis_date
+        configs.append(config)
+    return configs
+
+
+def day_after_data(input_file: str, date_col: str) -> Optional[str]:
+    """
+    Day after the last sale in a client's data (the analysis_date the loader recommends)
+
+    Args:
+        input_file: Client CSV file
+        date_col: Date column name
+
+    Returns:
+        Date as 'YYYY-MM-DD', or None if the dates cannot be read (the client then fails in run_client)
+    """
+    try:
+        dates, _, _ = parse_dates(pd.read_csv(input_file, usecols=[date_col])[date_col])
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read '{date_col}' from {input_file}: {e}")
+        return None
+    if dates.isna().all():
+        return None
+    return (dates.max().normalize() + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def run_client(client_config: Dict, save: bool = True) -> Dict:
+    """
+    Run analyzer, advanced analytics, reports and dashboard exports for one client.
+    Any error is caught and reported in the result, so one bad dataset never stops the batch.
+
+    Args:
+        client_config: Analyzer config plus 'input_file' with the client's data source
+        save: Write every output to the client's out_dir (False only computes them)
+
+    Returns:
+        Dict with client, status, seconds, per-step timings, out_dir, error and executive summary
+    """
+    config = dict(client_config)
+    input_file = config.pop('input_file')
+    client = config.get('project_name', str(input_file))
+    result = {'client': client, 'status': 'ok', 'seconds': 0.0, 'steps': {}, 'out_dir': None, 'error': None, 'summary': {}}
+    start = time.perf_counter()
+
+    try:
+        # Workers have no display; select the backend before pyplot is used
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        from modules.business_analytics import BusinessAnalyzer
+        from modules.dashboard import ExecutiveDashboard
+        from modules.advanced_analytics import AdvancedAnalytics
+        from modules.reports import weekly_comparison_report, product_velocity_matrix
+        from modules.utils import print_info, print_fig
+        from modules.logger import setup_logging
+        from modules.translations import create_filename_helper
+
+        setup_logging(log_level=config.get('log_level', 'WARNING'), config=config)
+        fn = create_filename_helper(config)
+
+        def step(name, func):
+            """Time one step of the flow"""
+            step_start = time.perf_counter()
+            value = func()
+            result['steps'][name] = round(time.perf_counter() - step_start, 3)
+            return value
+
+        def save_fig(fig, file_name):
+            """Export a figure and release it (workers keep no figures open)"""
+            print_fig(fig, analyzer.out_dir, file_name, save=save)
+            plt.close(fig)
+
+        # Notebook output (progress prints, "Exported to" lines) is not useful in a batch
+        with redirect_stdout(io.StringIO()):
+            analyzer = step('load', lambda: BusinessAnalyzer(data_source=input_file, config=config))
+            dashboard = ExecutiveDashboard(analyzer)
+            advanced = AdvancedAnalytics(analyzer)
+            result['out_dir'] = analyzer.out_dir
+
+            step('core', lambda: [
+                print_info(dashboard.create_quick_summary(), analyzer.out_dir, fn('DASH', 'quick_summary'), save=save),
+                print_info(analyzer.print_kpis(), analyzer.out_dir, fn('BA', 'kpi'), save=save),
+                print_info(analyzer.print_alerts(), analyzer.out_dir, fn('BA', 'alerts'), save=save),
+                print_info(analyzer.print_pareto(), analyzer.out_dir, fn('BA', 'pareto'), save=save),
+                print_info(analyzer.print_inventory_health(), analyzer.out_dir, fn('BA', 'inventory'), save=save),
+                print_info(analyzer.print_peak_times(), analyzer.out_dir, fn('BA', 'peak_times'), save=save)
+            ])
+            step('dashboards', lambda: [
+                save_fig(dashboard.create_full_dashboard(figsize=(20, 12)), fn('DASH', 'executive', 'png')),
+                save_fig(advanced.create_trend_analysis(figsize=(15, 10)), fn('DASH', 'trend', 'png')),
+                save_fig(product_velocity_matrix(analyzer), fn('DASH', 'velocity', 'png'))
+            ])
+            step('advanced', lambda: [
+                advanced.calculate_revenue_forecast(days_ahead=30),
+                print_info(advanced.print_revenue_forecast(), analyzer.out_dir, fn('AV', 'forecast'), save=save),
+                advanced.calculate_cross_sell_opportunities(limit=3),
+                print_info(advanced.print_cross_sell_opportunities(), analyzer.out_dir, fn('AV', 'cross_selling'), save=save),
+                advanced.calculate_anomalies(limit=3),
+                print_info(advanced.print_anomalies(), analyzer.out_dir, fn('AV', 'anomalies'), save=save),
+                advanced.calculate_recommendations(),
+                print_info(advanced.print_recommendations(), analyzer.out_dir, fn('AV', 'recommendations'), save=save),
+                advanced.calculate_customer_segmentation_rfm(),
+                print_info(advanced.print_customer_segmentation(), analyzer.out_dir, fn('AV', 'customer_segmentation'), save=save),
+                advanced.calculate_detailed_customer_segments(top_n=5),
+                print_info(advanced.print_detailed_customer_segments(top_n=5), analyzer.out_dir, fn('AV', 'detailed_customer_segments'), save=save)
+            ])
+            step('reports', lambda: print_info(weekly_comparison_report(analyzer), analyzer.out_dir, fn('REPORT', 'weekly_compare'), save=save))
+
+            summary = analyzer.get_executive_summary_dict()
+            result['summary'] = summary
+            if save:
+                summary_path = os.path.join(analyzer.out_dir, fn('BA', 'executive_summary', 'csv'))
+                os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+                pd.DataFrame([summary]).to_csv(summary_path, index=False)
+
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_portfolio(client_configs: List[Dict], max_workers: int = None, save: bool = True,
+                  summary_dir: str = 'outputs') -> pd.DataFrame:
+    """
+    Run every client in a process pool and write one consolidated run summary
+
+    Args:
+        client_configs: One config per client (see portfolio_configs)
+        max_workers: Upper bound on worker processes (defaults to the CPU count)
+        save: Write each client's outputs to its out_dir
+        summary_dir: Folder for the consolidated batch_summary_<timestamp>.csv
+
+    Returns:
+        DataFrame with one row per client: status, timings, error and executive summary columns
+    """
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(client_configs)))
+    logger.info(f"Running {len(client_configs)} clients on {workers} workers")
+    start = time.perf_counter()
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_client, config, save): config for config in client_configs}
+        for future in as_completed(futures):
+            config = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. out of memory); isolate it like any other failure
+                result = {'client': config.get('project_name'), 'status': 'failed', 'seconds': None,
+                          'steps': {}, 'out_dir': None, 'error': f"{type(e).__name__}: {e}", 'summary': {}}
+
+            if result['status'] == 'ok':
+                logger.info(f"✓ {result['client']} finished in {result['seconds']:.1f}s")
+            else:
+                logger.error(f"✗ {result['client']} failed: {result['error']}")
+            results.append(result)
+
+    wall_seconds = time.perf_counter() - start
+    rows = []
+    for result in sorted(results, key=lambda r: str(r['client'])):
+        row = {
+            'Client': result['client'],
+            'Status': result['status'],
+            'Seconds': result['seconds'],
+            **{f"{name} s": seconds for name, seconds in result['steps'].items()},
+            **result['summary'],
+            'Output Dir': result['out_dir'],
+            'Error': result['error']
+        }
+        rows.append(row)
+    summary = pd.DataFrame(rows)
+
+    os.makedirs(summary_dir, exist_ok=True)
+    summary_path = os.path.join(summary_dir, f"batch_summary_{datetime.now().strftime('%y%m%d_%H%M%S')}.csv")
+    summary.to_csv(summary_path, index=False)
+
+    client_seconds = sum(r['seconds'] or 0 for r in results)
+    failed = sum(r['status'] != 'ok' for r in results)
+    logger.info(f"Portfolio finished in {wall_seconds:.1f}s wall time ({client_seconds:.1f}s of client time), "
+                f"{failed} failed. Summary: {summary_path}")
+    return summary
+
+
+if __name__ == '__main__':
+    from modules.logger import setup_logging
+    setup_logging('INFO')
+
+    base_config = {
+        'out_dir': 'outputs',
+        'date_col': 'fecha',
+        'product_col': 'producto',
+        'description_col': 'glosa',
+        'revenue_col': 'total',
+        'quantity_col': 'cantidad',
+        'transaction_col': 'trans_id',
+        'cost_col': 'costo',
+        'customer_col': 'customer_id',
+        'top_products_threshold': 0.2,
+        'dead_stock_days': 30,
+        'currency_format': 'CLP',
+        'language': 'ENG',
+        'log_level': 'WARNING'
+    }
+    print(run_portfolio(portfolio_configs(base_config)).to_string(index=False))
@@ -12,10 +12,24 @@ import warnings
 warnings.filterwarnings('ignore')
 
 from modules.logger import get_logger
+from modules.snapshots import source_fingerprint, load_snapshot, save_snapshot
+from modules.dates import parse_dates
 
 # Initialize logger for this module
 logger = get_logger(__name__)
 
+# Columnar file formats that support reading only the configured columns
+COLUMNAR_EXTENSIONS = ('.parquet', '.pq', '.feather', '.arrow', '.ipc')
+
+# Non-config columns used by the analytics modules when present in the source
+OPTIONAL_COLUMNS = ['inith', 'initm', 'hour', 'weekday', 'weekday_num', 'customer_name', 'customer_location']
+
+# Repeated string columns stored as categoricals in compact mode (besides the configured id columns)
+COMPACT_CATEGORY_COLUMNS = ['customer_name', 'customer_location', 'weekday']
+
+# Integer columns downcast to the smallest safe type in compact mode (besides quantity/revenue/cost)
+COMPACT_INTEGER_COLUMNS = ['inith', 'initm', 'hour', 'weekday_num']
+
 
 class Business:
     """
@@ -30,6 +44,14 @@ class Business:
 
         # Raw data
         self.data = None
+        self._pending_rows = []  # Appended rows not yet concatenated into self.data (see data)
+        self.data_source = None  # Source path when data is streamed in chunks instead of loaded
+        self.date_format = None  # Date format detected on load (locked for later chunks)
+        self.date_parse_failures = 0  # Date values that could not be parsed
+
+        # Dimension tables (populated in compact mode)
+        self.product_dim = None
+        self.customer_dim = None
 
         # Calculated metrics (populated by BusinessAnalyzer)
         self.product_analysis = None
@@ -50,7 +72,7 @@ class Business:
         self.out_dir = self._set_out_dir()
 
         # Load data if provided
-        if data_source:
+        if data_source is not None:
             self.load_data(data_source)
             logger.info(f"Business initialized with data from: {data_source} {self.data.shape if self.data is not None else ''}")
 
@@ -86,32 +108,253 @@ class Business:
 
     def load_data(self, data_source: str):
         """Load data from file or DataFrame"""
+        if self.config.get('chunk_size') and isinstance(data_source, str):
+            # Streaming mode: rows are read chunk by chunk by BusinessAnalyzer, never all at once
+            self.data_source = data_source
+            logger.info(f"Streaming mode: {data_source} will be read in chunks of {self.config['chunk_size']:,} rows")
+            return
+
+        # Reuse a prepared snapshot when the source file and column mapping are unchanged
+        cache_dir = self.config.get('cache_dir')
+        fingerprint = None
+        if cache_dir and isinstance(data_source, str):
+            fingerprint = source_fingerprint(data_source, self.config, self.config.get('cache_hash_content', False))
+            snapshot = load_snapshot(cache_dir, fingerprint)
+            if snapshot is not None:
+                self.data = snapshot
+                if self.config.get('compact', False):
+                    self._build_dimensions()
+                self._set_date_range()
+                return
+
+        self.data = self._read_source(data_source)
+        self._prepare_data()
+
+        if fingerprint is not None:
+            save_snapshot(self.data, cache_dir, fingerprint)
+
+    def _read_source(self, data_source) -> pd.DataFrame:
+        """Read a DataFrame, CSV, Excel or columnar file into a raw (unprepared) frame"""
         if isinstance(data_source, pd.DataFrame):
-            self.data = data_source
+            return data_source
         elif data_source.endswith('.csv'):
-            self.data = pd.read_csv(data_source)
+            return pd.read_csv(data_source)
         elif data_source.endswith(('.xlsx', '.xls')):
-            self.data = pd.read_excel(data_source)
+            return pd.read_excel(data_source)
+        elif data_source.lower().endswith(COLUMNAR_EXTENSIONS):
+            return self._read_columnar(data_source)
         else:
             raise ValueError(f"Unsupported data source type: {data_source}")
 
-        self._prepare_data()
+    def _projected_columns(self, available) -> list:
+        """Columns the analytics modules need, limited to those present in the source"""
+        wanted = {value for key, value in self.config.items() if key.endswith('_col') and value}
+        wanted.update(OPTIONAL_COLUMNS)
+        return [col for col in available if col in wanted]
+
+    def _read_columnar(self, data_source: str) -> pd.DataFrame:
+        """
+        Read a Parquet, Feather or Arrow IPC file, loading only the configured columns.
+        Native datetime and integer dtypes are kept, so no parsing is needed afterwards.
+
+        Args:
+            data_source: Path to a .parquet/.pq, .feather or .arrow/.ipc file
+
+        Returns:
+            DataFrame with the projected columns
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+            import pyarrow.ipc as ipc
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(f"pyarrow is required to read columnar files ({data_source}): pip install pyarrow") from e
+
+        if data_source.lower().endswith(('.parquet', '.pq')):
+            columns = self._projected_columns(pq.read_schema(data_source).names)
+            table = pq.read_table(data_source, columns=columns)
+        else:
+            # Feather v2 is the Arrow IPC file format; memory-map so unused columns are never read
+            with pa.memory_map(data_source) as source:
+                columns = self._projected_columns(ipc.open_file(source).schema.names)
+            table = feather.read_table(data_source, columns=columns, memory_map=True)
+
+        logger.info(f"Columnar load: {len(columns)} columns projected from {data_source}")
+        return table.to_pandas()
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """Transaction lines; rows appended since the last access are concatenated here, on first use"""
+        if self._pending_rows:
+            self._data = pd.concat([self._data] + self._pending_rows, ignore_index=True)
+            self._pending_rows = []
+        return self._data
+
+    @data.setter
+    def data(self, value: pd.DataFrame):
+        self._data = value
+        self._pending_rows = []
+
+    @property
+    def is_streaming(self) -> bool:
+        """True when the source is read in chunks instead of being held in self.data"""
+        return self._data is None and self.data_source is not None
+
+    def iter_chunks(self, chunk_size: int = None):
+        """
+        Read the streaming source in fixed-size chunks, each one prepared like self.data
+
+        Args:
+            chunk_size: Rows per chunk (defaults to config['chunk_size'])
+
+        Yields:
+            Prepared DataFrame chunks with only the configured columns
+        """
+        chunk_size = chunk_size or self.config.get('chunk_size') or 100_000
+        source = self.data_source
+
+        if source.endswith('.csv'):
+            chunks = pd.read_csv(source, chunksize=chunk_size, usecols=lambda col: col in self._projected_columns([col]))
+        elif source.lower().endswith(COLUMNAR_EXTENSIONS):
+            chunks = self._iter_columnar_chunks(source, chunk_size)
+        else:
+            raise ValueError(f"Unsupported streaming source type: {source}")
+
+        for chunk in chunks:
+            yield self._prepare_frame(chunk)
+
+    def _iter_columnar_chunks(self, data_source: str, chunk_size: int):
+        """Yield projected DataFrame chunks from a Parquet, Feather or Arrow IPC file"""
+        try:
+            import pyarrow as pa
+            import pyarrow.ipc as ipc
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(f"pyarrow is required to read columnar files ({data_source}): pip install pyarrow") from e
+
+        if data_source.lower().endswith(('.parquet', '.pq')):
+            parquet_file = pq.ParquetFile(data_source)
+            columns = self._projected_columns(parquet_file.schema_arrow.names)
+            for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+                yield batch.to_pandas()
+        else:
+            with pa.memory_map(data_source) as source:
+                reader = ipc.open_file(source)
+                columns = self._projected_columns(reader.schema.names)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i).select(columns)
+                    # Record batches can be arbitrarily large, so re-slice them to chunk_size
+                    for offset in range(0, batch.num_rows, chunk_size):
+                        yield batch.slice(offset, chunk_size).to_pandas()
 
     def _prepare_data(self):
         """Prepare and clean data for analysis"""
         if self.data is None:
             return
 
-        # Convert date column
-        if self.config['date_col'] in self.data.columns:
-            self.data[self.config['date_col']] = pd.to_datetime(
-                self.data[self.config['date_col']],
-                errors='coerce'
+        self.data = self._prepare_frame(self.data)
+        if self.config.get('compact', False):
+            self._compact_data()
+        self._set_date_range()
+
+    def _prepare_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Parse dates and add time-based columns to a full dataset or a streamed chunk"""
+        # Convert date column (columnar sources already carry a native datetime dtype)
+        if self.config['date_col'] in df.columns and not pd.api.types.is_datetime64_any_dtype(df[self.config['date_col']]):
+            df[self.config['date_col']], self.date_format, failures = parse_dates(
+                df[self.config['date_col']],
+                date_format=self.date_format
             )
-        
-        # Get range of dates
+            if failures:
+                self.date_parse_failures += failures
+                logger.warning(f"{failures:,} '{self.config['date_col']}' values could not be parsed with format {self.date_format!r} and were set to NaT")
+
+        # Add time-based columns if they don't exist
+        if 'hour' not in df.columns and 'inith' in df.columns:
+            df['hour'] = df['inith']
+
+        if 'weekday' not in df.columns and self.config['date_col'] in df.columns:
+            df['weekday'] = df[self.config['date_col']].dt.day_name()
+            df['weekday_num'] = df[self.config['date_col']].dt.dayofweek
+
+        return df
+
+    def _compact_data(self):
+        """
+        Store repeated strings as categoricals (integer codes) and downcast integer columns.
+        Product and customer descriptions are also kept in small dimension tables.
+        """
+        memory_before = self.data.memory_usage(deep=True).sum()
+
+        id_columns = [self.config.get(key) for key in ('product_col', 'description_col', 'transaction_col', 'customer_col')]
+        for col in id_columns + COMPACT_CATEGORY_COLUMNS:
+            if col and col in self.data.columns and self.data[col].dtype == object:
+                # Skip near-unique columns (e.g. one transaction id per line): codes would not save memory
+                if self.data[col].nunique() <= len(self.data) / 2:
+                    self.data[col] = self.data[col].astype('category')
+
+        # Sums are accumulated as int64 by pandas, so narrow storage types are safe
+        value_columns = [self.config.get(key) for key in ('quantity_col', 'revenue_col', 'cost_col')]
+        for col in value_columns + COMPACT_INTEGER_COLUMNS:
+            if col and col in self.data.columns and pd.api.types.is_integer_dtype(self.data[col]):
+                self.data[col] = pd.to_numeric(self.data[col], downcast='integer')
+
+        self._build_dimensions()
+
+        memory_after = self.data.memory_usage(deep=True).sum()
+        logger.info(f"Compact mode: {memory_before / 1e6:.1f} MB -> {memory_after / 1e6:.1f} MB "
+                    f"({memory_after / max(len(self.data), 1):.0f} bytes/row)")
+
+    def _align_to_data(self, new_rows: pd.DataFrame) -> pd.DataFrame:
+        """Cast prepared new rows to the dtypes of self.data so appending keeps categoricals and narrow ints"""
+        # Reads the stored frame directly, so aligning does not concatenate the pending rows
+        for col in new_rows.columns.intersection(self._data.columns):
+            dtype = self._data[col].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                missing = pd.Index(new_rows[col].dropna().unique()).difference(dtype.categories)
+                if len(missing) > 0:
+                    self._data[col] = self._data[col].cat.add_categories(missing)
+                    for pending in self._pending_rows:
+                        pending[col] = pending[col].cat.add_categories(missing)
+                new_rows[col] = pd.Categorical(new_rows[col], categories=self._data[col].cat.categories)
+            elif pd.api.types.is_integer_dtype(dtype) and pd.api.types.is_integer_dtype(new_rows[col]):
+                info = np.iinfo(dtype)
+                if len(new_rows) == 0 or (new_rows[col].min() >= info.min and new_rows[col].max() <= info.max):
+                    new_rows[col] = new_rows[col].astype(dtype)
+        return new_rows
+
+    def _update_dimensions(self, new_rows: pd.DataFrame, products: bool = True):
+        """Add products (unless products is False) and customers first seen in new rows to the dimension tables"""
+        if products and self.product_dim is not None:
+            # Sale dates are not row attributes; BusinessAnalyzer refreshes those from its aggregates
+            attributes = self.product_dim.columns.intersection(new_rows.columns).tolist()
+            new_products = new_rows.groupby(self.config['product_col'], observed=True)[attributes].first()
+            self.product_dim = self.product_dim.combine_first(new_products)
+        if self.customer_dim is not None:
+            new_customers = new_rows.groupby(self.config['customer_col'], observed=True)[self.customer_dim.columns.tolist()].first()
+            self.customer_dim = self.customer_dim.combine_first(new_customers)
+
+    def _build_dimensions(self):
+        """Build the product and customer dimension tables from the loaded data"""
+        product_col = self.config['product_col']
+        description_col = self.config.get('description_col')
+        if description_col and description_col in self.data.columns:
+            self.product_dim = self.data.groupby(product_col, observed=True)[[description_col]].first()
+
+        customer_col = self.config.get('customer_col')
+        customer_attrs = [col for col in ('customer_name', 'customer_location') if col in self.data.columns]
+        if customer_col and customer_col in self.data.columns and customer_attrs:
+            self.customer_dim = self.data.groupby(customer_col, observed=True)[customer_attrs].first()
+
+    def _set_date_range(self):
+        """Get range of dates from the loaded data"""
         self.min_dt = self.data[self.config['date_col']].min()
         self.max_dt = self.data[self.config['date_col']].max()
+        self._check_date_range()
+
+    def _check_date_range(self):
+        """Print the data date range and warn if analysis_date falls outside it"""
         print(f"Data date range: {self.min_dt.date()} to {self.max_dt.date()}")
         print(f"Recommended analysis_date: {self.max_dt.date() + pd.Timedelta(days=1)} or later")
         
@@ -120,14 +363,6 @@ class Business:
             print(f"⚠️⚠️⚠️ Warning: Analysis date {analysis_date.date()} is before data range. ⚠️⚠️⚠️")
         if analysis_date > self.max_dt + pd.Timedelta(days=30):
             print(f"⚠️⚠️⚠️ Warning: Analysis date {analysis_date.date()} is significantly after data range. ⚠️⚠️⚠️")
-        
-        # Add time-based columns if they don't exist
-        if 'hour' not in self.data.columns and 'inith' in self.data.columns:
-            self.data['hour'] = self.data['inith']
-
-        if 'weekday' not in self.data.columns and self.config['date_col'] in self.data.columns:
-            self.data['weekday'] = self.data[self.config['date_col']].dt.day_name()
-            self.data['weekday_num'] = self.data[self.config['date_col']].dt.dayofweek
 
     def format_currency(self, value: float) -> str:
         """Format value as currency based on config"""
@@ -138,7 +373,11 @@ class Business:
 
     def get_date_range(self) -> Dict:
         """Get date range from data"""
-        if self.data is None or self.config['date_col'] not in self.data.columns:
+        if self.data is None:
+            # Streaming mode keeps only the range observed while folding chunks
+            return {'start': self.min_dt, 'end': self.max_dt}
+
+        if self.config['date_col'] not in self.data.columns:
             return {'start': None, 'end': None}
 
         return {
@@ -148,5 +387,5 @@ class Business:
 
     def __repr__(self):
         """String representation of Business instance"""
-        data_info = f"{len(self.data)} rows" if self.data is not None else "No data"
+        data_info = f"{len(self.data)} rows" if self.data is not None else f"streaming '{self.data_source}'" if self.data_source else "No data"
         return f"Business(project='{self.config['project_name']}', data={data_info})"
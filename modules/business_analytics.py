@@ -3,17 +3,31 @@ Business Analytics Core Module
 Core metrics calculations for Business class
 """
 
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from typing import Dict
 import warnings
 warnings.filterwarnings('ignore')
 
 from modules.business import Business
+from modules.aggregates import MetricAggregates, line_cost
+from modules.baskets import TransactionBaskets
+from modules.cube import SalesCube
+from modules.rolling_kpis import RollingKPIs
+from modules.periods import compare_periods
+from modules.metric_cache import MetricRegistry
 from modules.logger import get_logger
 
 # Initialize logger for this module
 logger = get_logger(__name__)
 
+# Hierarchy levels with per-level roll-ups, and the config keys that define each one
+HIERARCHY_LEVELS = {
+    'category': ['category_col', 'category_map'],  # Product -> category (data column or catalog mapping)
+    'location': ['location_col']  # Store, channel or customer location column
+}
+
 
 class BusinessAnalyzer(Business):
     """
@@ -29,59 +43,261 @@ class BusinessAnalyzer(Business):
             data_source: Path to data file or DataFrame
             config: Configuration dictionary
         """
+        # Partial aggregates (populated in streaming mode)
+        self.aggregates = None
+        self._baskets = None  # Basket table, built on first use
+        self._cube = None  # Sales cube, built on first use
+        self._cube_location_col = None  # Column the cube's location dimension was built from
+        self._rolling_kpis = None  # Prefix sums for trailing-window KPIs, built on first use
+
+        # Derived metrics are cached and recomputed only when their inputs change
+        self.data_version = 0  # Bumped whenever the base aggregates change
+        self.metric_cache = MetricRegistry(self)
+        self._register_metrics()
+
         # Initialize parent Business class
         super().__init__(data_source=data_source, config=config)
 
         # Calculate all base metrics if data is loaded
         if self.data is not None:
             self.calculate_all_metrics()
+        elif self.is_streaming:
+            self.calculate_streaming_metrics()
 
         logger.info(f"BusinessAnalyzer initialized for project: {self.config['project_name']}")
 
+    def _register_metrics(self):
+        """Declare each cached metric with the config keys and metrics it is built from"""
+        registry = self.metric_cache
+        registry.register('product_analysis', lambda: self._finalize_product_metrics(self.aggregates.product_totals()),
+                          config_keys=['top_products_threshold'])
+        registry.register('inventory', lambda: self._finalize_inventory_metrics(self.aggregates.last_sales()),
+                          config_keys=['analysis_date'])
+        registry.register('kpis', self.calculate_kpis)
+        registry.register('alerts', self.calculate_alerts,
+                          config_keys=['dead_stock_days', 'language', 'currency_format'],
+                          depends_on=['product_analysis', 'inventory', 'kpis', 'negative_margins'])
+        registry.register('pareto', self.calculate_pareto_insights,
+                          config_keys=['top_products_threshold'], depends_on=['product_analysis'])
+        registry.register('inventory_health', self.calculate_inventory_health, depends_on=['inventory'])
+        registry.register('peak_times', self.calculate_peak_times)
+        registry.register('product_margins', self.calculate_product_margins, config_keys=['top_products_threshold'])
+        registry.register('margin_pareto', self.calculate_margin_pareto,
+                          config_keys=['top_products_threshold'], depends_on=['product_margins'])
+        registry.register('negative_margins', self.calculate_negative_margins, depends_on=['product_margins'])
+        registry.register('margin_trend', self.calculate_margin_trend)
+        registry.register('margins_by_customer', lambda: self.calculate_margins_by('customer'), config_keys=['customer_col'])
+        for level, level_keys in HIERARCHY_LEVELS.items():
+            products = f'{level}_products'
+            registry.register(products, lambda level=level: self._level_products(level), config_keys=level_keys)
+            registry.register(f'pareto_by_{level}', lambda level=level: self.calculate_pareto_by(level),
+                              config_keys=['top_products_threshold'], depends_on=[products])
+            registry.register(f'inventory_health_by_{level}', lambda level=level: self.calculate_inventory_health_by(level),
+                              config_keys=['analysis_date'], depends_on=[products])
+            registry.register(f'kpis_by_{level}', lambda level=level: self.calculate_kpis_by(level),
+                              depends_on=[products, 'kpis'])
+            registry.register(f'margins_by_{level}', lambda level=level: self.calculate_margins_by(level),
+                              depends_on=[products])
+
+    @property
+    def product_analysis(self) -> pd.DataFrame:
+        """Per-product totals with Pareto columns (re-finalized if top_products_threshold changes)"""
+        if self.aggregates is None or self.aggregates.products is None:
+            return self._product_analysis
+        return self.metric_cache.get('product_analysis')
+
+    @product_analysis.setter
+    def product_analysis(self, value: pd.DataFrame):
+        self._product_analysis = value
+
+    @property
+    def inventory(self) -> pd.DataFrame:
+        """Per-product last sale and status (re-bucketed if analysis_date changes)"""
+        if self.aggregates is None or self.aggregates.products is None:
+            return self._inventory
+        return self.metric_cache.get('inventory')
+
+    @inventory.setter
+    def inventory(self, value: pd.DataFrame):
+        self._inventory = value
+
     # METRIC CALCULATION METHODS
     def calculate_all_metrics(self):
-        """Calculate all base metrics"""
+        """Calculate all base metrics in one fused pass over the data (see MetricAggregates.update)"""
         logger.debug("Starting base metrics calculation")
-        self.calculate_product_metrics()
-        self.calculate_inventory_metrics()
-        self.calculate_revenue_metrics()
+        # Keep the aggregates so append_data() can later fold in only the new rows
+        self.aggregates = MetricAggregates(self.config)
+        self.aggregates.update(self.data)
+        self._refresh_base_metrics()
         logger.info("✓ All base metrics calculated")
 
-    def calculate_product_metrics(self):
-        """Calculate product-level metrics"""
-        if self.data is None:
-            return
+    def _refresh_base_metrics(self):
+        """Rebuild product_analysis, inventory and revenue_metrics from the maintained aggregates"""
+        # A new data version invalidates every cached metric; derived ones are rebuilt on the next get_* call
+        self.data_version += 1
+        self._baskets = None
+        self._cube = None
+        self._rolling_kpis = None
+        self.product_dim = self.aggregates.product_dimension()
+        self.metric_cache.get('product_analysis')
+        self.metric_cache.get('inventory')
+        self._finalize_revenue_metrics(
+            total_revenue=self.aggregates.total_revenue,
+            total_transactions=self.aggregates.transaction_count,
+            total_products=len(self.aggregates.products)
+        )
 
-        logger.debug("Calculating product metrics...")
-        self.product_analysis = self.data.groupby(self.config['product_col']).agg({
-            self.config['description_col']: 'first', # Use first description
-            self.config['revenue_col']: 'sum', # Total revenue
-            self.config['quantity_col']: 'sum', # Total quantity sold
-            self.config['transaction_col']: 'count' # Number of transactions
-        }).sort_values(self.config['revenue_col'], ascending=False)
+    def append_data(self, new_rows):
+        """
+        Append new transaction lines and update the base metrics incrementally.
+        Only the new rows are folded into the maintained aggregates; Pareto columns,
+        inventory status and revenue KPIs are then refreshed from those aggregates.
 
-        # Add cumulative metrics
-        self.product_analysis['revenue_cum'] = self.product_analysis[self.config['revenue_col']].cumsum() # Cumulative revenue
-        total_revenue = self.product_analysis[self.config['revenue_col']].sum() # Total revenue
-        self.product_analysis['revenue_pct_cum'] = 100 * self.product_analysis['revenue_cum'] / total_revenue # Cumulative revenue %
+        Args:
+            new_rows: DataFrame or path to a file with the same columns as the loaded data
+        """
+        if self.aggregates is None:
+            raise ValueError("append_data requires an analyzer initialized with data")
 
-        # Identify top products
-        threshold_idx = int(len(self.product_analysis) * self.config['top_products_threshold']) # Index for top products
-        self.product_analysis['is_top_product'] = False # Initialize column
-        self.product_analysis.iloc[:threshold_idx, self.product_analysis.columns.get_loc('is_top_product')] = True # Set top products to True
-        logger.debug(f"Product metrics: {len(self.product_analysis)} products, {threshold_idx} top products")
+        new_rows = self._prepare_frame(self._read_source(new_rows).copy())
+        if len(new_rows) == 0:
+            return
 
-    def calculate_inventory_metrics(self):
-        """Calculate inventory health metrics"""
-        if self.data is None:
+        if self._data is not None:
+            # Concatenated into self.data only when a line-level consumer (baskets, cube, ...) next reads it
+            new_rows = self._align_to_data(new_rows)
+            self._pending_rows.append(new_rows)
+            self._update_dimensions(new_rows, products=False)  # product_dim is rebuilt from the aggregates below
+
+        self.aggregates.update(new_rows)
+        self.min_dt = self.aggregates.min_date
+        self.max_dt = self.aggregates.max_date
+        self._refresh_base_metrics()
+        logger.info(f"Appended {len(new_rows):,} rows ({self.aggregates.rows:,} total)")
+
+    def product_name(self, product) -> str:
+        """Description of a product from the product dimension (the product id if it has none)"""
+        description_col = self.config.get('description_col')
+        if self.product_dim is None or description_col not in self.product_dim.columns:
+            return product
+        name = self.product_dim[description_col].get(product)
+        return product if pd.isna(name) else name
+
+    def product_names(self, products) -> np.ndarray:
+        """Descriptions for many products at once (product id where there is none)"""
+        products = pd.Index(products)
+        description_col = self.config.get('description_col')
+        if self.product_dim is None or description_col not in self.product_dim.columns:
+            return products.astype(object).to_numpy()
+        names = self.product_dim[description_col].reindex(products)
+        return names.astype(object).where(names.notna(), products.astype(object)).to_numpy()
+
+    @property
+    def baskets(self) -> TransactionBaskets:
+        """Transaction (basket) table, built once from the loaded data and reused until the data changes"""
+        if self._baskets is None and self.data is not None:
+            self._baskets = TransactionBaskets(self.data, self.config)
+        return self._baskets
+
+    def product_categories(self) -> pd.Series:
+        """
+        Category of each product: config['category_map'] (product -> category, e.g. built from
+        a client catalog) where given, else the category_col of the data
+        """
+        categories = pd.Series(dtype=object)
+        category_col = self.config.get('category_col')
+        if self.product_dim is not None and category_col in self.product_dim.columns:
+            categories = self.product_dim[category_col].astype(object)
+        category_map = self.config.get('category_map')
+        if category_map:
+            categories = pd.Series(category_map, dtype=object).combine_first(categories)
+        return categories.dropna()
+
+    @property
+    def cube(self) -> SalesCube:
+        """Sales cube (day, hour, product, customer, location, category), built once from the loaded data and reused until the data changes"""
+        location_col = self.config.get('location_col', 'customer_location')
+        if self._cube is not None and self._cube_location_col != location_col:
+            self._cube = None  # The location dimension is read from another column now
+        if self._cube is None and self.data is not None:
+            self._cube = SalesCube(self.data, self.config)
+            self._cube_location_col = location_col
+            categories = self.product_categories()
+            if len(categories) > 0:
+                self._cube.add_level('category', 'product', categories)
+        return self._cube
+
+    @property
+    def rolling_kpis(self) -> RollingKPIs:
+        """Trailing-window KPIs for every day, built once from the cube and reused until the data changes"""
+        if self._rolling_kpis is None and self.cube is not None:
+            self._rolling_kpis = RollingKPIs(self.cube)
+        return self._rolling_kpis
+
+    def calculate_streaming_metrics(self):
+        """
+        Calculate base metrics by folding the source chunk by chunk.
+        product_analysis, inventory and revenue_metrics are built from the partial
+        aggregates, so the raw rows are never in memory all at once.
+        """
+        logger.debug("Starting streaming base metrics calculation")
+        self.aggregates = MetricAggregates(self.config)
+        for chunk in self.iter_chunks():
+            self.aggregates.update(chunk)
+
+        if self.aggregates.products is None:
+            logger.warning(f"No rows read from {self.data_source}")
             return
 
-        logger.debug("Calculating inventory metrics...")
-        last_sale = self.data.groupby(self.config['product_col']).agg({
-            self.config['date_col']: 'max', # Last sale date
-            self.config['description_col']: 'first' # Product description
-        }).reset_index()
+        self.min_dt = self.aggregates.min_date
+        self.max_dt = self.aggregates.max_date
+        self._check_date_range()
+
+        self._refresh_base_metrics()
+        logger.info(f"✓ All base metrics calculated from {self.aggregates.rows:,} streamed rows")
 
+    def calculate_product_metrics(self) -> pd.DataFrame:
+        """Calculate product-level metrics (finalized from the fused aggregates, like product_analysis)"""
+        if self.aggregates is None or self.aggregates.products is None:
+            return None
+        return self.metric_cache.get('product_analysis')
+
+    def _finalize_product_metrics(self, product_totals: pd.DataFrame) -> pd.DataFrame:
+        """Sort per-product totals and add Pareto columns"""
+        product_analysis = self._pareto_columns(product_totals)
+        self.product_analysis = product_analysis
+        return product_analysis
+
+    def _pareto_columns(self, product_totals: pd.DataFrame) -> pd.DataFrame:
+        """Per-product totals sorted by revenue with cumulative revenue and top-product flags"""
+        product_analysis = product_totals.sort_values(self.config['revenue_col'], ascending=False)
+
+        # Add cumulative metrics
+        product_analysis['revenue_cum'] = product_analysis[self.config['revenue_col']].cumsum() # Cumulative revenue
+        total_revenue = product_analysis[self.config['revenue_col']].sum() # Total revenue
+        product_analysis['revenue_pct_cum'] = 100 * product_analysis['revenue_cum'] / total_revenue # Cumulative revenue %
+
+        # Identify top products
+        threshold_idx = int(len(product_analysis) * self.config['top_products_threshold']) # Index for top products
+        product_analysis['is_top_product'] = False # Initialize column
+        product_analysis.iloc[:threshold_idx, product_analysis.columns.get_loc('is_top_product')] = True # Set top products to True
+        logger.debug(f"Product metrics: {len(product_analysis)} products, {threshold_idx} top products")
+        return product_analysis
+
+    def calculate_inventory_metrics(self) -> pd.DataFrame:
+        """Calculate inventory health metrics (finalized from the fused aggregates, like inventory)"""
+        if self.aggregates is None or self.aggregates.products is None:
+            return None
+        return self.metric_cache.get('inventory')
+
+    def _finalize_inventory_metrics(self, last_sale: pd.DataFrame) -> pd.DataFrame:
+        """Bucket per-product last sale dates into inventory status"""
+        inventory = self._inventory_status(last_sale)
+        self.inventory = inventory
+        return inventory
+
+    def _inventory_status(self, last_sale: pd.DataFrame) -> pd.DataFrame:
+        """Days since each product's last sale and its status bucket (Hot ... Zombie)"""
         analysis_date = pd.Timestamp(self.config['analysis_date'])
         last_sale['days_since_sale'] = (analysis_date - last_sale[self.config['date_col']]).dt.days
 
@@ -92,9 +308,9 @@ class BusinessAnalyzer(Business):
             labels=['Hot', 'Active', 'Slowing', 'Cold', 'Dead', 'Zombie']
         )
 
-        self.inventory = last_sale
         status_counts = last_sale['status'].value_counts().to_dict()
         logger.debug(f"Inventory status: {status_counts}")
+        return last_sale
 
     def calculate_revenue_metrics(self):
         """Calculate revenue-based metrics"""
@@ -107,12 +323,23 @@ class BusinessAnalyzer(Business):
         self.revenue_metrics = {
             'total_revenue': self.data[self.config['revenue_col']].sum(), # Total revenue
             'total_transactions': self.data[self.config['transaction_col']].nunique(), # Unique transactions
-            'avg_transaction_value': self.data.groupby(self.config['transaction_col'])[self.config['revenue_col']].sum().mean(), # Average transaction value
+            'avg_transaction_value': self.baskets.table['total'].mean(), # Average transaction value
             'total_products': self.data[self.config['product_col']].nunique(), # Unique products sold
             'date_range': date_range # Date range {start, end}
         }
         logger.debug(f"Revenue metrics: {self.revenue_metrics['total_revenue']:.0f} total, {self.revenue_metrics['total_transactions']} transactions")
 
+    def _finalize_revenue_metrics(self, total_revenue: float, total_transactions: int, total_products: int):
+        """Build revenue metrics from pre-aggregated totals"""
+        self.revenue_metrics = {
+            'total_revenue': total_revenue, # Total revenue
+            'total_transactions': total_transactions, # Unique transactions
+            'avg_transaction_value': total_revenue / total_transactions if total_transactions else 0, # Mean of per-transaction totals
+            'total_products': total_products, # Unique products sold
+            'date_range': {'start': self.aggregates.min_date, 'end': self.aggregates.max_date} # Date range folded so far (no pass over the lines)
+        }
+        logger.debug(f"Revenue metrics: {self.revenue_metrics['total_revenue']:.0f} total, {self.revenue_metrics['total_transactions']} transactions")
+
     def calculate_kpis(self) -> Dict:
         """Calculate key performance indicators"""
         if self.revenue_metrics is None:
@@ -124,11 +351,17 @@ class BusinessAnalyzer(Business):
         # Calculate period comparisons
         mid_date = date_range['start'] + (date_range['end'] - date_range['start']) / 2
 
-        current_period = self.data[self.data[self.config['date_col']] >= mid_date] # Current period data
-        previous_period = self.data[self.data[self.config['date_col']] < mid_date] # Previous period data
+        if self.aggregates is not None:
+            # Split the maintained revenue-per-timestamp series instead of masking every row
+            timestamp_revenue = self.aggregates.timestamp_revenue
+            current_revenue = timestamp_revenue[timestamp_revenue.index >= mid_date].sum()
+            previous_revenue = timestamp_revenue[timestamp_revenue.index < mid_date].sum()
+        else:
+            current_period = self.data[self.data[self.config['date_col']] >= mid_date] # Current period data
+            previous_period = self.data[self.data[self.config['date_col']] < mid_date] # Previous period data
 
-        current_revenue = current_period[self.config['revenue_col']].sum() # Current period revenue
-        previous_revenue = previous_period[self.config['revenue_col']].sum() # Previous period revenue
+            current_revenue = current_period[self.config['revenue_col']].sum() # Current period revenue
+            previous_revenue = previous_period[self.config['revenue_col']].sum() # Previous period revenue
 
         growth_rate = ((current_revenue - previous_revenue) / previous_revenue * 100) if previous_revenue > 0 else 0 # Growth %
 
@@ -192,6 +425,16 @@ class BusinessAnalyzer(Business):
                     'action': get_text('alert_balanced_portfolio_action', lang)
                 })
 
+        # Check for products sold below cost
+        negative_margins = self.metric_cache.get('negative_margins')
+        if negative_margins and negative_margins['count'] > 0:
+            alerts['critical'].append({
+                'type': 'negative_margin',
+                'message': get_text('alert_negative_margin_msg', lang, count=negative_margins['count']),
+                'impact': get_text('alert_negative_margin_impact', lang, amount=self.format_currency(negative_margins['total_loss'])),
+                'action': get_text('alert_negative_margin_action', lang)
+            })
+
         # Check for growth
         kpis = self.get_kpis()
         if kpis.get('revenue_growth', 0) > 10:
@@ -217,15 +460,19 @@ class BusinessAnalyzer(Business):
         if self.product_analysis is None:
             return {}
 
-        # Calculate Pareto insights
-        twenty_percent = int(len(self.product_analysis) * self.config['top_products_threshold'])
-        top_products = self.product_analysis.iloc[:twenty_percent]
+        self.pareto = self._pareto_summary(self.product_analysis)
+        return self.pareto
+
+    def _pareto_summary(self, product_analysis: pd.DataFrame) -> Dict:
+        """80/20 summary of products already sorted by revenue (see _pareto_columns)"""
+        twenty_percent = int(len(product_analysis) * self.config['top_products_threshold'])
+        top_products = product_analysis.iloc[:twenty_percent]
 
         revenue_from_top = top_products[self.config['revenue_col']].sum()
-        total_revenue = self.product_analysis[self.config['revenue_col']].sum()
+        total_revenue = product_analysis[self.config['revenue_col']].sum()
         revenue_pct = (revenue_from_top / total_revenue) * 100
 
-        self.pareto = {
+        return {
             'top_products_count': twenty_percent,
             'top_products_pct': self.config['top_products_threshold'] * 100,
             'revenue_from_top': revenue_from_top,
@@ -234,38 +481,47 @@ class BusinessAnalyzer(Business):
             'concentration_level': 'High' if revenue_pct > 80 else 'Medium' if revenue_pct > 60 else 'Low'
         }
 
-        return self.pareto
-
     def calculate_inventory_health(self) -> Dict:
         """Calculate inventory health summary"""
         if self.inventory is None:
             return {}
 
-        status_summary = self.inventory['status'].value_counts().to_dict() # Status distribution
-        dead_stock = self.inventory[self.inventory['status'].isin(['Dead', 'Zombie'])] # Dead stock count
+        return self._inventory_health_summary(self.inventory)
+
+    def _inventory_health_summary(self, inventory: pd.DataFrame) -> Dict:
+        """Status distribution, dead stock and at-risk products of an inventory table"""
+        status_summary = inventory['status'].value_counts().to_dict() # Status distribution
+        dead_stock = inventory[inventory['status'].isin(['Dead', 'Zombie'])] # Dead stock count
 
         inventory_health = {
             'status_distribution': status_summary,
             'dead_stock_count': len(dead_stock),
             'dead_stock_products': dead_stock.to_dict('records'),
-            'healthy_stock_pct': (status_summary.get('Hot', 0) + status_summary.get('Active', 0)) / len(self.inventory) * 100,
-            'at_risk_products': self.inventory[self.inventory['status'] == 'Slowing'].to_dict('records')[:5]
+            'healthy_stock_pct': (status_summary.get('Hot', 0) + status_summary.get('Active', 0)) / len(inventory) * 100,
+            'at_risk_products': inventory[inventory['status'] == 'Slowing'].to_dict('records')[:5]
         }
 
         return inventory_health
 
     def calculate_peak_times(self) -> Dict:
         """Calculate peak business times"""
-        if self.data is None or 'hour' not in self.data.columns:
+        if self.data is None and self.aggregates is not None:
+            # Streaming mode: hourly/weekday revenue were folded while reading
+            hourly_revenue = self.aggregates.hourly_revenue
+            weekday_revenue = self.aggregates.weekday_revenue
+        elif self.data is None or 'hour' not in self.data.columns:
             return {}
+        else:
+            hourly_revenue = self.cube.rollup('hour')['revenue'] # Revenue by hour
+            weekday_revenue = self.cube.rollup('weekday')['revenue'] # Revenue by weekday
 
-        # Revenue by hour
-        hourly_revenue = self.data.groupby('hour')[self.config['revenue_col']].sum()
+        if len(hourly_revenue) == 0:
+            return {}
         peak_hour = hourly_revenue.idxmax()
 
         # Revenue by weekday
-        if 'weekday' in self.data.columns:
-            daily_revenue = self.data.groupby('weekday')[self.config['revenue_col']].sum()
+        if weekday_revenue is not None and len(weekday_revenue) > 0:
+            daily_revenue = weekday_revenue
             peak_day = daily_revenue.idxmax()
             valley_day = daily_revenue.idxmin()
         else:
@@ -281,42 +537,307 @@ class BusinessAnalyzer(Business):
 
         return peak_times
 
-    # PUBLIC GET METHODS (with lazy calculation)
+    # PROFITABILITY (cost of goods sold folded in the same pass as revenue)
+    def line_margins(self) -> pd.Series:
+        """Gross margin of each loaded line: revenue minus cost of goods sold"""
+        if self.data is None or self.config.get('cost_col') not in self.data.columns:
+            return None
+        revenue = self.data[self.config['revenue_col']].to_numpy()
+        return pd.Series(revenue - line_cost(self.data, self.config), index=self.data.index, name='gross_margin')
+
+    def calculate_product_margins(self) -> pd.DataFrame:
+        """Per-product gross margin sorted by margin, with margin Pareto columns (None without cost data)"""
+        if self.aggregates is None or not self.aggregates.has_cost:
+            logger.debug(f"No '{self.config.get('cost_col')}' column: margin metrics are not available")
+            return None
+
+        product_margins = self.aggregates.product_costs().copy()
+        revenue = product_margins[self.config['revenue_col']]
+        product_margins['gross_margin'] = revenue - product_margins[self.config['cost_col']]
+        product_margins['margin_pct'] = np.divide(product_margins['gross_margin'], revenue,
+                                                  out=np.zeros(len(revenue)), where=revenue != 0) * 100
+        product_margins = product_margins.sort_values('gross_margin', ascending=False)
+
+        # Add cumulative metrics (the share can pass 100% before the loss-making products bring it back down)
+        product_margins['margin_cum'] = product_margins['gross_margin'].cumsum() # Cumulative gross margin
+        total_margin = product_margins['gross_margin'].sum()
+        product_margins['margin_pct_cum'] = 100 * product_margins['margin_cum'] / total_margin if total_margin else 0.0
+
+        threshold_idx = int(len(product_margins) * self.config['top_products_threshold']) # Index for top products
+        product_margins['is_top_margin_product'] = np.arange(len(product_margins)) < threshold_idx
+        logger.debug(f"Product margins: {len(product_margins)} products, total margin {total_margin:.0f}")
+        return product_margins
+
+    def calculate_margin_pareto(self) -> Dict:
+        """80/20 analysis on gross margin instead of revenue"""
+        product_margins = self.metric_cache.get('product_margins')
+        if product_margins is None:
+            return {}
+
+        total_revenue = product_margins[self.config['revenue_col']].sum()
+        total_margin = product_margins['gross_margin'].sum()
+        top_products = product_margins[product_margins['is_top_margin_product']]
+        margin_from_top = top_products['gross_margin'].sum()
+        margin_pct = (margin_from_top / total_margin) * 100 if total_margin else 0.0
+
+        return {
+            'total_revenue': total_revenue,
+            'total_cost': product_margins[self.config['cost_col']].sum(),
+            'gross_margin': total_margin,
+            'gross_margin_pct': total_margin / total_revenue * 100 if total_revenue else 0.0,
+            'top_products_count': len(top_products),
+            'top_products_pct': self.config['top_products_threshold'] * 100,
+            'margin_from_top': margin_from_top,
+            'margin_from_top_pct': margin_pct,
+            'top_products_list': top_products.head(10).reset_index().to_dict('records'),
+            'concentration_level': 'High' if margin_pct > 80 else 'Medium' if margin_pct > 60 else 'Low'
+        }
+
+    def calculate_negative_margins(self) -> Dict:
+        """Products whose total revenue does not cover their cost of goods sold"""
+        product_margins = self.metric_cache.get('product_margins')
+        if product_margins is None:
+            return {}
+
+        below_cost = product_margins[product_margins['gross_margin'] < 0].sort_values('gross_margin')
+        return {
+            'count': len(below_cost),
+            'total_loss': -below_cost['gross_margin'].sum(),
+            'revenue_at_loss': below_cost[self.config['revenue_col']].sum(),
+            'products': below_cost.reset_index().to_dict('records')
+        }
+
+    def calculate_margin_trend(self) -> pd.DataFrame:
+        """Daily revenue, cost, gross margin and margin % over the full date range (days without sales as 0)"""
+        if self.aggregates is None or not self.aggregates.has_cost:
+            return pd.DataFrame()
+
+        trend = pd.DataFrame({'revenue': self.aggregates.daily_revenue, 'cost': self.aggregates.daily_cost}).fillna(0)
+        if len(trend) > 0:
+            trend = trend.reindex(pd.date_range(trend.index.min(), trend.index.max(), freq='D'), fill_value=0)
+        return _with_margin(trend)
+
+    def calculate_margins_by(self, level: str) -> pd.DataFrame:
+        """Revenue, cost, gross margin and margin % per cube level ('category', 'location', 'customer', 'month', ...)"""
+        if self.cube is None or 'cost' not in self.cube.measures:
+            return pd.DataFrame()
+        if level in HIERARCHY_LEVELS and self.metric_cache.get(f'{level}_products') is None:
+            return pd.DataFrame()  # Also keeps the category level in step with category_map
+        margins = _with_margin(self.cube.rollup(level, ['revenue', 'cost']).copy())
+        return margins.sort_values('gross_margin', ascending=False)
+
+    # CATEGORY / LOCATION ROLL-UPS (read from the cube, never from the line items)
+    def _level_products(self, level: str) -> pd.DataFrame:
+        """Per (level, product) totals laid out like the product groupby, plus each product's last sale there"""
+        if self.cube is None:
+            logger.warning(f"Roll-ups by {level} need the data in memory (not available in streaming mode)")
+            return None
+        if level == 'category':
+            categories = self.product_categories()
+            if len(categories) == 0:
+                logger.warning("Roll-ups by category need a product category: set config['category_col'] or config['category_map']")
+                return None
+            self.cube.add_level('category', 'product', categories)  # Picks up a changed category_map
+        elif self.config.get('location_col', 'customer_location') not in self.data.columns:
+            logger.warning(f"Roll-ups by location need a location column: '{self.config.get('location_col', 'customer_location')}' "
+                           f"is not in the data, set config['location_col'] (e.g. 'location', 'store' or 'channel')")
+            return None
+
+        rolled = self.cube.rollup([level, 'product'], ['revenue', 'quantity', 'lines', 'last_sale'])
+        level_products = pd.DataFrame({
+            self.config['description_col']: self.product_names(rolled.index.get_level_values('product')),
+            self.config['revenue_col']: rolled['revenue'], # Total revenue
+            self.config['quantity_col']: rolled['quantity'], # Total quantity sold
+            self.config['transaction_col']: rolled['lines'], # Number of transactions (lines), as in product_analysis
+            self.config['date_col']: rolled['last_sale'] # Last sale date
+        }, index=rolled.index)
+        logger.debug(f"Roll-up by {level}: {level_products.index.get_level_values(0).nunique()} groups, {len(level_products):,} rows")
+        return level_products
+
+    def _level_transactions(self, level: str) -> pd.Series:
+        """Distinct transactions per level; a basket with several products of one category counts once"""
+        if level != 'category':
+            return self.cube.rollup(level, ['transactions'])['transactions']
+
+        # Transaction x category incidence: basket x product incidence times a product x category indicator
+        baskets = self.baskets
+        codes, categories = pd.factorize(self.product_categories().reindex(baskets.products), sort=True)
+        mapped = codes >= 0
+        indicator = sparse.csr_matrix(
+            (np.ones(mapped.sum(), dtype='int32'), (np.flatnonzero(mapped), codes[mapped])),
+            shape=(len(baskets.products), len(categories))
+        )
+        counts = (baskets.incidence() @ indicator).getnnz(axis=0)
+        return pd.Series(counts, index=pd.Index(categories, name=level))
+
+    def calculate_pareto_by(self, level: str) -> Dict:
+        """80/20 analysis inside each category or location, keyed by its label"""
+        level_products = self.metric_cache.get(f'{level}_products')
+        if level_products is None:
+            return {}
+
+        pareto = {}
+        for group, products in level_products.groupby(level=level, sort=True):
+            product_totals = products.droplevel(level).drop(columns=self.config['date_col'])
+            pareto[group] = self._pareto_summary(self._pareto_columns(product_totals))
+        return pareto
+
+    def calculate_inventory_health_by(self, level: str) -> Dict:
+        """Inventory health inside each category or location (days since the product last sold there)"""
+        level_products = self.metric_cache.get(f'{level}_products')
+        if level_products is None:
+            return {}
+
+        inventory_health = {}
+        for group, products in level_products.groupby(level=level, sort=True):
+            last_sale = products.droplevel(level)[[self.config['date_col'], self.config['description_col']]].reset_index()
+            inventory_health[group] = self._inventory_health_summary(self._inventory_status(last_sale))
+        return inventory_health
+
+    def calculate_kpis_by(self, level: str) -> pd.DataFrame:
+        """
+        Revenue, share, transactions, average ticket, products and growth per category or location.
+        Growth splits the periods at the start of the KPI mid date's day (the cube is daily), so it
+        can differ slightly from the overall KPI, which splits at the exact mid timestamp.
+        """
+        level_products = self.metric_cache.get(f'{level}_products')
+        if level_products is None:
+            return pd.DataFrame()
+
+        revenue = level_products[self.config['revenue_col']].groupby(level=level).sum()
+        transactions = self._level_transactions(level).reindex(revenue.index, fill_value=0)
+        mid_day = pd.Timestamp(self.get_kpis()['mid_date']).normalize()
+        current = self.cube.slice(day=(mid_day, None)).rollup(level, ['revenue'])['revenue'].reindex(revenue.index, fill_value=0)
+        previous = revenue - current
+
+        kpis = pd.DataFrame({
+            'total_revenue': revenue,
+            'revenue_share_pct': revenue / revenue.sum() * 100 if revenue.sum() else 0.0,
+            'total_transactions': transactions,
+            'avg_transaction_value': np.divide(revenue, transactions, out=np.zeros(len(revenue)), where=transactions > 0),
+            'total_products': level_products.groupby(level=level).size(),
+            'revenue_growth': np.divide(current - previous, previous, out=np.zeros(len(revenue)), where=previous > 0) * 100,
+            'current_period_revenue': current,
+            'previous_period_revenue': previous
+        })
+        return kpis.sort_values('total_revenue', ascending=False)
+
+    # PUBLIC GET METHODS (cached, recomputed only when their inputs change)
     def get_kpis(self, show: bool = False) -> Dict:
         """Get KPIs (calculate if not yet calculated)"""
-        if self.kpis is None:
-            self.calculate_kpis()
+        kpis = self.metric_cache.get('kpis')
 
         if show:
             print(self.print_kpis())
 
-        return self.kpis
+        return kpis
 
     def get_alerts(self, show: bool = False) -> Dict:
         """Get alerts (calculate if not yet calculated)"""
-        if self.alerts is None:
-            self.calculate_alerts()
+        alerts = self.metric_cache.get('alerts')
 
         if show:
             print(self.print_alerts())
 
-        return self.alerts
+        return alerts
 
     def get_pareto_insights(self) -> Dict:
         """Get pareto insights (calculate if not yet calculated)"""
-        if self.pareto is None:
-            self.calculate_pareto_insights()
-        return self.pareto
+        return self.metric_cache.get('pareto')
 
     def get_inventory_health(self) -> Dict:
         """Get inventory health summary (calculate if not yet calculated)"""
-        inventory_health = self.calculate_inventory_health()
-        return inventory_health
+        return self.metric_cache.get('inventory_health')
 
     def get_peak_times(self) -> Dict:
         """Get peak business times (calculate if not yet calculated)"""
-        peak_times = self.calculate_peak_times()
-        return peak_times
+        return self.metric_cache.get('peak_times')
+
+    def get_kpis_by(self, level: str) -> pd.DataFrame:
+        """Get KPIs per 'category' or 'location' (calculate if not yet calculated)"""
+        return self.metric_cache.get(f'kpis_by_{self._check_level(level)}')
+
+    def get_pareto_by(self, level: str) -> Dict:
+        """Get pareto insights per 'category' or 'location' (calculate if not yet calculated)"""
+        return self.metric_cache.get(f'pareto_by_{self._check_level(level)}')
+
+    def get_inventory_health_by(self, level: str) -> Dict:
+        """Get inventory health per 'category' or 'location' (calculate if not yet calculated)"""
+        return self.metric_cache.get(f'inventory_health_by_{self._check_level(level)}')
+
+    def get_kpi_series(self, window: int = 30) -> pd.DataFrame:
+        """
+        Get KPIs for every day over a trailing window (see RollingKPIs.series)
+
+        Args:
+            window: Days in each trailing window; growth compares it with the window before
+
+        Returns:
+            DataFrame indexed by day (empty in streaming mode)
+        """
+        if self.rolling_kpis is None:
+            logger.warning("The KPI series needs the data in memory (not available in streaming mode)")
+            return pd.DataFrame()
+        return self.rolling_kpis.series(window)
+
+    def get_kpis_as_of(self, date, window: int = 30) -> Dict:
+        """Get the KPIs of the trailing window ending on a date (a prefix-sum lookup, no pass over the data)"""
+        if self.rolling_kpis is None:
+            logger.warning("KPIs as of a date need the data in memory (not available in streaming mode)")
+            return {}
+        return self.rolling_kpis.as_of(date, window)
+
+    def get_period_comparison(self, period: str = 'week', metrics: list = None) -> pd.DataFrame:
+        """
+        Get every week, month or quarter with its change versus the previous period and the year before
+
+        Args:
+            period: 'week' (ISO year-week, WoW), 'month' (MoM) or 'quarter' (QoQ)
+            metrics: Metrics to compare (see periods.compare_periods)
+
+        Returns:
+            DataFrame indexed by period (empty in streaming mode)
+        """
+        if self.cube is None:
+            logger.warning("Period comparisons need the data in memory (not available in streaming mode)")
+            return pd.DataFrame()
+        return compare_periods(self.cube, period, metrics)
+
+    def get_margin_pareto(self) -> Dict:
+        """Get gross margin totals and 80/20 analysis (calculate if not yet calculated)"""
+        return self.metric_cache.get('margin_pareto')
+
+    def get_negative_margins(self) -> Dict:
+        """Get products sold below cost (calculate if not yet calculated)"""
+        return self.metric_cache.get('negative_margins')
+
+    def get_margin_trend(self, freq: str = 'D') -> pd.DataFrame:
+        """
+        Get the gross margin time series
+
+        Args:
+            freq: 'D' for daily, or a pandas frequency such as 'W' or 'MS' to sum the days into periods
+
+        Returns:
+            DataFrame with revenue, cost, gross_margin and margin_pct per period
+        """
+        trend = self.metric_cache.get('margin_trend')
+        if freq == 'D' or len(trend) == 0:
+            return trend
+        return _with_margin(trend[['revenue', 'cost']].resample(freq).sum())
+
+    def get_margins_by(self, level: str) -> pd.DataFrame:
+        """Get gross margin per 'category', 'location' or 'customer' (calculate if not yet calculated)"""
+        if level != 'customer':
+            self._check_level(level)
+        return self.metric_cache.get(f'margins_by_{level}')
+
+    @staticmethod
+    def _check_level(level: str) -> str:
+        """Validate a hierarchy level name"""
+        if level not in HIERARCHY_LEVELS:
+            raise ValueError(f"Unknown level '{level}'. Options: {', '.join(HIERARCHY_LEVELS)}")
+        return level
 
     # PRINT/FORMAT METHODS
     def print_kpis(self) -> str:
@@ -325,10 +846,7 @@ class BusinessAnalyzer(Business):
 
         lang = self.config.get('language', 'ENG')
 
-        if self.kpis is None:
-            self.calculate_kpis()
-
-        kpis = self.kpis
+        kpis = self.get_kpis()
         mid_date = kpis['mid_date']
         date_range = self.revenue_metrics['date_range']
 
@@ -353,10 +871,7 @@ class BusinessAnalyzer(Business):
 
         lang = self.config.get('language', 'ENG')
 
-        if self.alerts is None:
-            self.calculate_alerts()
-
-        alerts = self.alerts
+        alerts = self.get_alerts()
         alerts_str = []
 
         if alerts['critical']:
@@ -386,10 +901,7 @@ class BusinessAnalyzer(Business):
 
         lang = self.config.get('language', 'ENG')
 
-        if self.pareto is None:
-            self.calculate_pareto_insights()
-
-        pareto = self.pareto
+        pareto = self.get_pareto_insights()
         pareto_str = []
 
         # Top insight with formatted translation
@@ -415,7 +927,7 @@ class BusinessAnalyzer(Business):
         from modules.translations import get_text
 
         lang = self.config.get('language', 'ENG')
-        inventory_health = self.calculate_inventory_health()
+        inventory_health = self.get_inventory_health()
 
         if not inventory_health:
             return "No inventory data available"
@@ -448,7 +960,7 @@ class BusinessAnalyzer(Business):
         from modules.translations import get_text
 
         lang = self.config.get('language', 'ENG')
-        peak_times = self.calculate_peak_times()
+        peak_times = self.get_peak_times()
 
         if not peak_times:
             return "No timing data available"
@@ -462,15 +974,79 @@ class BusinessAnalyzer(Business):
 
         return "\n".join(peaks_str)
 
+    def print_profitability(self, top_products_count: int = 5) -> str:
+        """Format gross margin, margin Pareto and below-cost products as string"""
+        from modules.translations import get_text
+
+        lang = self.config.get('language', 'ENG')
+        margin_pareto = self.get_margin_pareto()
+
+        if not margin_pareto:
+            return "No cost data available"
+
+        profit_str = []
+        profit_str.append(f"💵 {get_text('gross_margin', lang)}: {self.format_currency(margin_pareto['gross_margin'])} "
+                          f"({margin_pareto['gross_margin_pct']:.1f}% {get_text('revenue_share', lang)})")
+
+        top_margin_text = get_text('top_margin_products', lang,
+            count=margin_pareto['top_products_count'],
+            pct=margin_pareto['top_products_pct'],
+            margin_pct=f"{margin_pareto['margin_from_top_pct']:.1f}")
+        profit_str.append(f"🎯 {get_text('top_insight', lang)}: {top_margin_text}")
+
+        profit_str.append(f"\n📋 {get_text('top_margin_generators', lang, n=top_products_count)}:")
+        for i, product in enumerate(margin_pareto['top_products_list'][:top_products_count], 1):
+            profit_str.append(f"  {i}. {product[self.config['description_col']]}: {self.format_currency(product['gross_margin'])} "
+                              f"({product['margin_pct']:.1f}%)")
+
+        negative_margins = self.get_negative_margins()
+        if negative_margins['count'] > 0:
+            profit_str.append(f"\n🔴 {get_text('selling_below_cost', lang)}: {negative_margins['count']} {get_text('products', lang)} "
+                              f"(-{self.format_currency(negative_margins['total_loss'])})")
+            for product in negative_margins['products'][:3]:
+                profit_str.append(f"  • {product[self.config['description_col']]}: {self.format_currency(product['gross_margin'])}")
+
+        return "\n".join(profit_str)
+
+    def print_breakdown(self, level: str, top_n: int = 10) -> str:
+        """Format KPIs per category or location as string (largest revenue first)"""
+        from modules.translations import get_text
+
+        lang = self.config.get('language', 'ENG')
+        kpis = self.get_kpis_by(level)
+
+        if len(kpis) == 0:
+            return f"No {level} data available"
+
+        breakdown_str = [f"🗂️ {get_text(f'breakdown_by_{level}', lang)}"]
+        for group, row in kpis.head(top_n).iterrows():
+            breakdown_str.append(f"\n  {group}: {self.format_currency(row['total_revenue'])} "
+                                 f"({row['revenue_share_pct']:.1f}% {get_text('revenue_share', lang)})")
+            breakdown_str.append(f"    🛒 {get_text('transactions', lang).capitalize()}: {int(row['total_transactions']):,}"
+                                 f" | {get_text('avg_transaction', lang)}: {self.format_currency(row['avg_transaction_value'])}"
+                                 f" | {get_text('growth', lang)}: {row['revenue_growth']:.1f}%")
+
+        return "\n".join(breakdown_str)
+
     # SUMMARY METHODS
     def get_executive_summary_dict(self) -> Dict:
         """Get executive summary as dictionary (for CSV export)"""
+        kpis = self.get_kpis()
+        inventory_health = self.get_inventory_health()
         return {
             'Date': self.config['analysis_date'],
-            'Total Revenue': self.get_kpis().get('total_revenue', 0),
-            'Revenue Growth %': self.get_kpis().get('revenue_growth', 0),
-            'Total Transactions': self.get_kpis().get('total_transactions', 0),
+            'Total Revenue': kpis.get('total_revenue', 0),
+            'Revenue Growth %': kpis.get('revenue_growth', 0),
+            'Total Transactions': kpis.get('total_transactions', 0),
             'Top 20% Revenue Share': self.get_pareto_insights().get('revenue_from_top_pct', 0),
-            'Dead Stock Count': self.get_inventory_health().get('dead_stock_count', 0),
-            'Inventory Health %': self.get_inventory_health().get('healthy_stock_pct', 0)
+            'Dead Stock Count': inventory_health.get('dead_stock_count', 0),
+            'Inventory Health %': inventory_health.get('healthy_stock_pct', 0)
         }
+
+
+def _with_margin(frame: pd.DataFrame) -> pd.DataFrame:
+    """Add gross_margin and margin_pct (of revenue, 0 where there is none) to a revenue/cost frame"""
+    frame['gross_margin'] = frame['revenue'] - frame['cost']
+    frame['margin_pct'] = np.divide(frame['gross_margin'], frame['revenue'],
+                                    out=np.zeros(len(frame)), where=frame['revenue'] != 0) * 100
+    return frame
@@ -0,0 +1,111 @@
+"""
+Cohorts Module
+Customer cohorts by first-purchase month: retention matrix, revenue-per-customer curves
+and historical customer lifetime value, built with integer month arithmetic and bincount pivots
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict
+import warnings
+warnings.filterwarnings('ignore')
+
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+
+class CohortAnalysis:
+    """
+    Cohort x months-since-first-purchase matrices and per-customer lifetime value.
+    Cohort c holds the customers whose first purchase fell in month c; column k counts
+    their activity k months later. Cells after the last month of data are NaN, not 0.
+    """
+
+    def __init__(self, data: pd.DataFrame, config: Dict):
+        """
+        Build the cohort matrices and customer table
+
+        Args:
+            data: Prepared transaction lines (must contain customer_col)
+            config: Configuration dictionary with the column mapping
+        """
+        self.config = config
+        date_col = config['date_col']
+
+        dates = data[date_col].to_numpy()
+        valid = data[config['customer_col']].notna().to_numpy() & ~np.isnat(dates)
+        customer_codes, customers = pd.factorize(data[config['customer_col']][valid])
+        revenue = data[config['revenue_col']].to_numpy(dtype='float64')[valid]
+        revenue = np.nan_to_num(revenue)
+        n_customers = len(customers)
+
+        # Months since 1970-01 (the Period('M') ordinal), so month differences are plain integers
+        months = dates[valid].astype('datetime64[M]').astype('int64')
+        first_month = np.full(n_customers, np.iinfo('int64').max)
+        np.minimum.at(first_month, customer_codes, months)
+        start_month = first_month.min() if n_customers else 0
+        last_month = months.max() if len(months) else 0
+
+        cohort = first_month - start_month  # Cohort of each customer (0 = first month of data)
+        age = months - first_month[customer_codes]  # Months since the customer's first purchase
+        n_cohorts = int(last_month - start_month) + 1 if n_customers else 0
+        n_ages = n_cohorts
+
+        # Single pivot per measure: cell = cohort * n_ages + age
+        cells = cohort[customer_codes] * n_ages + age
+        size = n_cohorts * n_ages
+        active_pairs = pd.unique(customer_codes.astype('int64') * n_ages + age)  # Distinct (customer, age)
+        active = np.bincount(cohort[active_pairs // n_ages] * n_ages + active_pairs % n_ages, minlength=size)
+        cohort_revenue = np.bincount(cells, weights=revenue, minlength=size)
+
+        active = active.reshape(n_cohorts, n_ages).astype('float64')
+        cohort_revenue = cohort_revenue.reshape(n_cohorts, n_ages)
+        observed = np.arange(n_ages)[None, :] <= (n_cohorts - 1 - np.arange(n_cohorts))[:, None]
+        active[~observed] = np.nan
+        cohort_revenue[~observed] = np.nan
+
+        index = pd.PeriodIndex.from_ordinals(np.arange(n_cohorts) + start_month, freq='M').rename('cohort')
+        columns = pd.RangeIndex(n_ages, name='months_since_first')
+        sizes = np.bincount(cohort, minlength=n_cohorts)
+        has_customers = sizes > 0  # Months in which nobody bought for the first time form no cohort
+        self.cohort_sizes = pd.Series(sizes, index=index, name='customers')[has_customers]
+        self.active_customers = pd.DataFrame(active, index=index, columns=columns)[has_customers]
+        self.revenue = pd.DataFrame(cohort_revenue, index=index, columns=columns)[has_customers]
+
+        # Per-customer history: distinct transactions, revenue, first and last purchase
+        transaction_codes = pd.factorize(data[config['transaction_col']])[0][valid]
+        has_transaction = transaction_codes >= 0
+        n_transactions = int(transaction_codes.max()) + 1 if has_transaction.any() else 1
+        pairs = pd.unique(customer_codes[has_transaction].astype('int64') * n_transactions + transaction_codes[has_transaction])
+        transactions = np.bincount(pairs // n_transactions, minlength=n_customers)
+        total_revenue = np.bincount(customer_codes, weights=revenue, minlength=n_customers)
+
+        timestamps = dates[valid].view('int64')
+        first_purchase = np.full(n_customers, np.iinfo('int64').max)
+        last_purchase = np.full(n_customers, np.iinfo('int64').min)
+        np.minimum.at(first_purchase, customer_codes, timestamps)
+        np.maximum.at(last_purchase, customer_codes, timestamps)
+        active_months = last_month - first_month + 1  # Months from first purchase to the end of the data
+
+        self.customers = pd.DataFrame({
+            'cohort': index[cohort],
+            'first_purchase': first_purchase.view(dates.dtype),
+            'last_purchase': last_purchase.view(dates.dtype),
+            'transactions': transactions,
+            'revenue': total_revenue,
+            'avg_order_value': np.divide(total_revenue, transactions, out=np.zeros(n_customers), where=transactions > 0),
+            'clv_monthly': total_revenue / active_months  # Historical value per month as a customer
+        }, index=pd.Index(customers, name=self.config['customer_col']))
+        logger.debug(f"Cohorts: {n_cohorts} monthly cohorts, {n_customers:,} customers")
+
+    @property
+    def retention(self) -> pd.DataFrame:
+        """Share of each cohort active k months after its first purchase (%)"""
+        return self.active_customers.div(self.cohort_sizes, axis=0) * 100
+
+    @property
+    def revenue_per_customer(self) -> pd.DataFrame:
+        """Cumulative revenue per original cohort customer, k months after the first purchase"""
+        return self.revenue.cumsum(axis=1, skipna=False).div(self.cohort_sizes, axis=0)
@@ -0,0 +1,341 @@
+"""
+Cube Module
+Pre-aggregated sales cube over day, hour, product, customer and location, built once from
+the line items, with a small query API (slice, rollup, top_k) shared by the reports
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Union
+import warnings
+warnings.filterwarnings('ignore')
+
+from modules.aggregates import line_cost
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+# Measures stored per cell: sums, plus the latest sale timestamp (rolled up with max); cost only when cost_col is present
+MEASURES = ['revenue', 'cost', 'quantity', 'lines', 'transactions', 'last_sale']
+
+
+def iso_year_week(days: pd.DatetimeIndex) -> np.ndarray:
+    """ISO year-week label of each day ('2024-W52', '2025-W01'); labels sort in calendar order"""
+    iso = days.isocalendar()
+    return (iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)).to_numpy()
+
+
+# Levels derived from the day dimension (the calendar dimension): label of each day
+DAY_LEVELS = {
+    'weekday': lambda days: days.day_name(),  # Monday ... Sunday
+    'weekday_num': lambda days: days.dayofweek,  # 0 = Monday
+    'week': lambda days: days + pd.to_timedelta(6 - days.dayofweek, unit='D'),  # Week ending Sunday (pandas 'W')
+    'iso_week': lambda days: days.isocalendar().week.to_numpy(),  # ISO week number
+    'iso_year_week': iso_year_week,  # '2025-W01' (ISO year, so weeks never merge across years)
+    'month': lambda days: days.to_period('M'),
+    'quarter': lambda days: days.to_period('Q'),
+    'year': lambda days: days.year
+}
+
+
+class SalesCube:
+    """
+    Revenue, cost of goods sold, quantity, line count, distinct transactions and last sale per
+    (day, hour, product, customer, location) cell. Dimensions missing from the data are left out; coarser levels of a dimension
+    (e.g. product -> category) can be added with add_level. Distinct transactions are kept on a second
+    grain without product (each transaction counted once, in the cell of its first line), so they
+    stay exact when rolled up over anything but product; grouped or filtered by product they count
+    the baskets containing each product (exact as long as a transaction's lines share day, hour,
+    customer and location).
+    """
+
+    def __init__(self, data: pd.DataFrame, config: Dict):
+        """
+        Build the cube from prepared line items
+
+        Args:
+            data: Prepared transaction lines
+            config: Configuration dictionary with the column mapping
+                (optional 'location_col', default 'customer_location')
+        """
+        self.config = config
+        self._rollups = {}  # Rolled-up frames by query, so repeated queries are instant
+        self._derived_levels = {}  # Codes and labels of calendar and attribute levels, built on first use
+
+        columns = {
+            'day': data[config['date_col']].dt.normalize(),
+            'hour': data['hour'] if 'hour' in data.columns else None,
+            'product': data[config['product_col']],
+            'customer': data[config['customer_col']] if config.get('customer_col') in data.columns else None,
+            'location': data[config.get('location_col', 'customer_location')]
+            if config.get('location_col', 'customer_location') in data.columns else None
+        }
+
+        # Sorted codes per dimension (-1 where the value is missing)
+        self.dimensions = {}
+        codes = {}
+        for name, values in columns.items():
+            if values is None:
+                continue
+            codes[name], labels = pd.factorize(values, sort=True)
+            self.dimensions[name] = pd.Index(labels, name=name)
+        self.dimension_names = list(self.dimensions)
+
+        revenue = data[config['revenue_col']].to_numpy(dtype='float64')
+        quantity = data[config['quantity_col']].to_numpy(dtype='float64')
+        transaction_codes, _ = pd.factorize(data[config['transaction_col']])
+
+        # Line grain: every dimension
+        line_cells, self.cells = self._group(codes, self.dimension_names)
+        n_cells = len(self.cells)
+        self.cells['revenue'] = np.bincount(line_cells, weights=np.nan_to_num(revenue), minlength=n_cells)
+        if config.get('cost_col') in data.columns:
+            self.cells['cost'] = np.bincount(line_cells, weights=line_cost(data, config), minlength=n_cells)
+        self.cells['quantity'] = np.bincount(line_cells, weights=np.nan_to_num(quantity), minlength=n_cells)
+        self.cells['lines'] = np.bincount(line_cells, weights=~np.isnan(revenue), minlength=n_cells).astype('int64')
+        self.cells['transactions'] = _distinct_count(line_cells, transaction_codes, n_cells)
+        timestamps = data[config['date_col']].to_numpy()
+        last_sale = np.full(n_cells, np.iinfo('int64').min)
+        np.maximum.at(last_sale, line_cells, timestamps.view('int64'))  # NaT is the int64 minimum
+        self.cells['last_sale'] = last_sale.view(timestamps.dtype)
+
+        # Transaction grain: no product; each transaction sits in the cell of its first line
+        has_transaction = transaction_codes >= 0
+        n_transactions = int(transaction_codes.max()) + 1 if has_transaction.any() else 0
+        first_line = np.full(n_transactions, len(data), dtype='int64')
+        np.minimum.at(first_line, transaction_codes[has_transaction], np.flatnonzero(has_transaction))
+        transaction_dims = [name for name in self.dimension_names if name != 'product']
+        first_codes = {name: codes[name][first_line] for name in transaction_dims}
+        transaction_cells, self.transaction_cells = self._group(first_codes, transaction_dims)
+        self.transaction_cells['transactions'] = np.bincount(transaction_cells, minlength=len(self.transaction_cells))
+
+        self.attribute_levels = {}  # name -> (dimension, label of each dimension value)
+        self.product_filtered = False
+        logger.debug(f"Built sales cube: {n_cells:,} cells over {', '.join(self.dimension_names)} "
+                     f"from {len(data):,} lines")
+
+    @staticmethod
+    def _group(codes: Dict[str, np.ndarray], names: List[str]):
+        """Cell of each row (sorted by the codes of names) and the table of distinct code combinations"""
+        n_rows = len(codes[names[0]])
+        key = np.zeros(n_rows, dtype='int64')
+        for name in names:
+            level = codes[name].astype('int64') + 1  # Missing (-1) becomes 0
+            key = key * (int(level.max(initial=0)) + 1) + level
+            key = pd.factorize(key, sort=True)[0]  # Renumber so the combined key never overflows
+        n_cells = int(key.max(initial=-1)) + 1
+
+        # Every row of a cell has the same codes, so any of them describes it
+        representative = np.empty(n_cells, dtype='int64')
+        representative[key] = np.arange(n_rows)
+        table = pd.DataFrame({name: codes[name][representative].astype('int32') for name in names})
+        return key, table
+
+    def __len__(self) -> int:
+        """Number of line-grain cells"""
+        return len(self.cells)
+
+    @property
+    def measures(self) -> List[str]:
+        """Measures available in this cube"""
+        return [m for m in MEASURES if m in self.cells.columns]
+
+    @property
+    def levels(self) -> List[str]:
+        """Every dimension and derived level that can be sliced or rolled up"""
+        return self.dimension_names + list(DAY_LEVELS) + list(self.attribute_levels)
+
+    def add_level(self, name: str, dimension: str, mapping: pd.Series):
+        """
+        Add a coarser level of a dimension, e.g. add_level('category', 'product', product_categories).
+        Only this cube (or slice) gets the level; its parent and other slices are unchanged.
+
+        Args:
+            name: Level name for slice/rollup
+            dimension: Dimension the level groups ('product', 'customer', ...)
+            mapping: Series from dimension label to level label (unmapped values are left out of rollups)
+        """
+        if dimension not in self.dimensions:
+            raise ValueError(f"Unknown or unavailable cube dimension '{dimension}'")
+        self.attribute_levels[name] = (dimension, pd.Series(mapping).reindex(self.dimensions[dimension]).to_numpy())
+        self._derived_levels.pop(name, None)
+        self._rollups.clear()
+
+    def slice(self, **filters) -> 'SalesCube':
+        """
+        Keep the cells matching every filter
+
+        Args:
+            **filters: level=value, level=[values] or day=(start, end) (inclusive), e.g.
+                slice(weekday='Saturday', product=['P1', 'P2'])
+
+        Returns:
+            SalesCube over the matching cells (same dimensions)
+        """
+        cells = self.cells
+        transaction_cells = self.transaction_cells
+        product_filtered = self.product_filtered
+        for level, value in filters.items():
+            cells = cells[self._match(cells, level, value)]
+            if self._base_dimension(level) == 'product':
+                product_filtered = True
+            else:
+                transaction_cells = transaction_cells[self._match(transaction_cells, level, value)]
+
+        # The slice shares the dimension tables; its cells and caches are its own
+        view = SalesCube.__new__(SalesCube)
+        view.__dict__.update(self.__dict__)
+        view.cells = cells
+        view.transaction_cells = transaction_cells
+        view.product_filtered = product_filtered
+        view._rollups = {}
+        view._derived_levels = dict(self._derived_levels)
+        view.attribute_levels = dict(self.attribute_levels)
+        return view
+
+    def rollup(self, by: Union[str, List[str]] = None, measures: List[str] = None) -> Union[pd.DataFrame, pd.Series]:
+        """
+        Sum the measures by one or more levels (cells with a missing label are left out, like groupby)
+
+        Args:
+            by: Level or list of levels (dimensions, calendar levels of DAY_LEVELS such as 'weekday',
+                'iso_year_week', 'month', or levels added with add_level); None for grand totals
+            measures: Subset of 'revenue', 'cost', 'quantity', 'lines', 'transactions', 'last_sale' (default all)
+
+        Returns:
+            DataFrame indexed by the levels, sorted by label (Series of totals when by is None).
+            Results are cached on the cube; copy before modifying them.
+        """
+        by = [by] if isinstance(by, str) else list(by or [])
+        measures = list(measures or self.measures)
+
+        key = (tuple(by), tuple(measures))
+        if key not in self._rollups:
+            result = self._rolled(by, 'line')
+            by_product = any(self._base_dimension(level) == 'product' for level in by)
+            if 'transactions' in measures and not by_product and not self.product_filtered:
+                # Transaction grain: each transaction counted once, however many products or lines it has
+                transactions = self._rolled(by, 'transaction')['transactions']
+                result = result.assign(transactions=transactions.reindex(result.index, fill_value=0))
+            result = result[measures]
+            self._rollups[key] = result.iloc[0] if not by else result
+
+        return self._rollups[key]
+
+    def top_k(self, k: int, by: Union[str, List[str]] = 'product', measure: str = 'revenue') -> pd.DataFrame:
+        """
+        Largest k groups of a level by one measure
+
+        Args:
+            k: Number of groups
+            by: Level or list of levels to rank
+            measure: Measure to rank by
+
+        Returns:
+            DataFrame of the top k groups, largest first (ties keep label order)
+        """
+        rolled = self.rollup(by)
+        return rolled.sort_values(measure, ascending=False, kind='stable').head(k)
+
+    def daily(self, measures: List[str] = None) -> pd.DataFrame:
+        """Measures per day over the full date range, days without sales included as 0"""
+        daily = self.rollup('day', measures)
+        if len(daily) == 0:
+            return daily
+        days = pd.date_range(daily.index.min(), daily.index.max(), freq='D', name='day')
+        return daily.reindex(days, fill_value=0)
+
+    def _rolled(self, by: List[str], grain: str) -> pd.DataFrame:
+        """Cached sum of one grain's measures by a list of levels"""
+        key = (tuple(by), grain)
+        if key not in self._rollups:
+            table = self.cells if grain == 'line' else self.transaction_cells
+            measures = [m for m in (MEASURES if grain == 'line' else ['transactions']) if m in table.columns]
+            if not by:
+                totals = table[[m for m in measures if m != 'last_sale']].sum().to_frame().T
+                if 'last_sale' in measures:
+                    totals['last_sale'] = table['last_sale'].max()
+                self._rollups[key] = totals
+            else:
+                level_codes = {level: self._level_codes(table, level) for level in by}
+                keep = np.logical_and.reduce([level_codes[level] >= 0 for level in by])
+                cell, groups = self._group({level: level_codes[level][keep] for level in by}, by)
+                sums = {m: np.bincount(cell, weights=table[m].to_numpy()[keep], minlength=len(groups))
+                        for m in measures if m != 'last_sale'}
+                if 'last_sale' in measures:
+                    timestamps = table['last_sale'].to_numpy()[keep]
+                    last_sale = np.full(len(groups), np.iinfo('int64').min)
+                    np.maximum.at(last_sale, cell, timestamps.view('int64'))
+                    sums['last_sale'] = last_sale.view(timestamps.dtype)
+                labels = [self._level_labels(level)[groups[level].to_numpy()] for level in by]
+                index = pd.MultiIndex.from_arrays(labels, names=by) if len(by) > 1 else pd.Index(labels[0], name=by[0])
+                frame = pd.DataFrame(sums, index=index)
+                for m in ('lines', 'transactions'):
+                    if m in frame.columns:
+                        frame[m] = frame[m].astype('int64')
+                self._rollups[key] = frame
+        return self._rollups[key]
+
+    def _base_dimension(self, level: str) -> str:
+        """Dimension a level is read from ('day' for calendar levels)"""
+        if level in DAY_LEVELS:
+            return 'day'
+        if level in self.attribute_levels:
+            return self.attribute_levels[level][0]
+        return level
+
+    def _level_codes(self, table: pd.DataFrame, level: str) -> np.ndarray:
+        """Code of each cell on a dimension or derived level (-1 where missing)"""
+        dimension = self._base_dimension(level)
+        if dimension not in table.columns:
+            raise ValueError(f"Unknown or unavailable cube level '{level}'. Options: {', '.join(self.levels)}")
+        dimension_codes = table[dimension].to_numpy()
+        if dimension == level:
+            return dimension_codes
+        level_codes = self._derived_level(level)[0]
+        return np.where(dimension_codes >= 0, level_codes[np.maximum(dimension_codes, 0)], -1)
+
+    def _level_labels(self, level: str) -> pd.Index:
+        """Labels behind a level's codes"""
+        if level in self.dimensions:
+            return self.dimensions[level]
+        return self._derived_level(level)[1]
+
+    def _derived_level(self, level: str):
+        """Code of each dimension value on a derived level, and the level's sorted labels"""
+        cache = self._derived_levels
+        if level not in cache:
+            if level in DAY_LEVELS:
+                labels = DAY_LEVELS[level](pd.DatetimeIndex(self.dimensions['day']))
+            else:
+                labels = self.attribute_levels[level][1]
+            codes, uniques = pd.factorize(pd.Index(labels), sort=True)
+            cache[level] = (codes, pd.Index(uniques, name=level))
+        return cache[level]
+
+    def _match(self, table: pd.DataFrame, level: str, value) -> np.ndarray:
+        """Mask of the cells whose label matches a filter value"""
+        if level not in self.levels:
+            raise ValueError(f"Unknown or unavailable cube level '{level}'. Options: {', '.join(self.levels)}")
+        labels = self._level_labels(level)
+        if level == 'day' and isinstance(value, tuple):
+            start, end = (pd.Timestamp(v) if v is not None else None for v in value)
+            wanted = np.ones(len(labels), dtype=bool)
+            if start is not None:
+                wanted &= labels >= start
+            if end is not None:
+                wanted &= labels <= end
+        else:
+            values = value if isinstance(value, (list, set, np.ndarray, pd.Index)) else [value]
+            wanted = labels.isin(list(values))
+        level_codes = self._level_codes(table, level)
+        return (level_codes >= 0) & wanted[np.maximum(level_codes, 0)]
+
+
+def _distinct_count(cells: np.ndarray, values: np.ndarray, n_cells: int) -> np.ndarray:
+    """Number of distinct non-missing values per cell"""
+    valid = values >= 0
+    n_values = int(values.max()) + 1 if valid.any() else 1
+    pairs = pd.unique(cells[valid].astype('int64') * n_values + values[valid])
+    return np.bincount(pairs // n_values, minlength=n_cells)
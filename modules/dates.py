@@ -0,0 +1,104 @@
+"""
+Date Parsing Module
+Format-detecting, memoized datetime parsing for transaction date columns
+"""
+
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+# Known date formats, tried in order. When two formats parse the same share of the
+# sample the earlier one wins, so 12-hour '%I' comes before '%H' with an AM/PM suffix.
+DATE_FORMAT_CANDIDATES = [
+    '%m/%d/%Y %I:%M:%S %p',
+    '%m/%d/%Y %H:%M:%S %p',  # Data generators in data/*/ write 24-hour times with an AM/PM suffix
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%Y-%m-%dT%H:%M:%S',
+    'ISO8601',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y',
+    '%d-%m-%Y %H:%M:%S',
+    '%d-%m-%Y',
+]
+
+
+def detect_date_format(values, formats: Optional[List[str]] = None, sample_size: int = 1000) -> Optional[str]:
+    """
+    Detect the date format that parses the largest share of a sample
+
+    Args:
+        values: Distinct date strings to sample from
+        formats: Candidate formats (defaults to DATE_FORMAT_CANDIDATES)
+        sample_size: Maximum number of values to test each candidate on
+
+    Returns:
+        Best format, or None if no candidate parses at least half of the sample
+    """
+    formats = formats or DATE_FORMAT_CANDIDATES
+    values = pd.Index(values).dropna()
+    if len(values) == 0:
+        return None
+
+    if len(values) > sample_size:
+        # Spread the sample over the whole column, not just its first rows
+        positions = np.random.default_rng(0).choice(len(values), size=sample_size, replace=False)
+        values = values[np.sort(positions)]
+
+    best_format, best_parsed = None, 0
+    for fmt in formats:
+        parsed = pd.to_datetime(values, format=fmt, errors='coerce').notna().sum()
+        if parsed > best_parsed:
+            best_format, best_parsed = fmt, parsed
+        if best_parsed == len(values):
+            break
+
+    if best_parsed < len(values) / 2:
+        return None
+    return best_format
+
+
+def parse_dates(values: pd.Series, date_format: Optional[str] = None) -> Tuple[pd.Series, Optional[str], int]:
+    """
+    Parse a date column, converting each distinct string only once
+
+    Args:
+        values: Column of date strings
+        date_format: Locked format to use; detected from the column when None
+
+    Returns:
+        Tuple of (parsed datetime Series, format used, number of values that failed to parse)
+    """
+    codes, uniques = pd.factorize(values)
+    if date_format is None:
+        date_format = detect_date_format(uniques)
+
+    if date_format is None:
+        logger.warning("No known date format matched, falling back to per-value inference")
+        parsed_uniques = pd.to_datetime(uniques, format='mixed', errors='coerce')
+    else:
+        parsed_uniques = pd.to_datetime(uniques, format=date_format, errors='coerce')
+
+    # Map parsed distinct values back onto the rows (code -1 marks missing input)
+    parsed = np.asarray(parsed_uniques, dtype='datetime64[ns]')
+    if len(parsed) > 0:
+        result = parsed[codes]
+    else:
+        result = np.empty(len(codes), dtype='datetime64[ns]')
+    result[codes == -1] = np.datetime64('NaT')
+
+    failed_uniques = np.asarray(pd.isna(parsed_uniques))
+    failures = int(failed_uniques[codes[codes >= 0]].sum()) if len(failed_uniques) > 0 else 0
+    logger.debug(f"Parsed {len(values):,} dates from {len(uniques):,} distinct values with format {date_format!r}")
+
+    return pd.Series(result, index=values.index, name=values.name), date_format, failures
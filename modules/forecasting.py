@@ -0,0 +1,189 @@
+"""
+Forecasting Module
+Batched per-product demand forecasting: a dense product x day matrix built once,
+and simple models fitted to every product at the same time with array operations
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+import warnings
+warnings.filterwarnings('ignore')
+
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+
+def moving_average_forecast(matrix: np.ndarray, horizon: int, window: int = 7) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Flat forecast at the mean of the last `window` days, per row
+
+    Args:
+        matrix: Series x day values
+        horizon: Days to forecast
+        window: Moving average window in days
+
+    Returns:
+        Tuple of (series x horizon forecast, per-series std of one-step-ahead errors)
+    """
+    window = max(1, min(window, matrix.shape[1]))
+    level = matrix[:, -window:].mean(axis=1)
+
+    # One-step errors: each day against the mean of the `window` days before it
+    cumulative = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(matrix, axis=1)], axis=1)
+    rolling_mean = (cumulative[:, window:] - cumulative[:, :-window]) / window  # Mean of days [t - window, t)
+    errors = matrix[:, window:] - rolling_mean[:, :-1]
+    return np.repeat(level[:, None], horizon, axis=1), _error_std(errors)
+
+
+def exponential_smoothing_forecast(matrix: np.ndarray, horizon: int, alpha: float = 0.3) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simple exponential smoothing, per row (one loop over days, vectorized over series)
+
+    Args:
+        matrix: Series x day values
+        horizon: Days to forecast
+        alpha: Smoothing factor (0-1); higher reacts faster to recent days
+
+    Returns:
+        Tuple of (series x horizon forecast, per-series std of one-step-ahead errors)
+    """
+    level = matrix[:, 0].astype('float64')
+    errors = np.empty((matrix.shape[0], max(matrix.shape[1] - 1, 0)))
+    for t in range(1, matrix.shape[1]):
+        errors[:, t - 1] = matrix[:, t] - level
+        level = level + alpha * errors[:, t - 1]
+    return np.repeat(level[:, None], horizon, axis=1), _error_std(errors)
+
+
+def seasonal_naive_forecast(matrix: np.ndarray, horizon: int, season: int = 7) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Repeat the last season (same weekday last week by default), per row
+
+    Args:
+        matrix: Series x day values
+        horizon: Days to forecast
+        season: Season length in days
+
+    Returns:
+        Tuple of (series x horizon forecast, per-series std of one-step-ahead errors)
+    """
+    season = max(1, min(season, matrix.shape[1]))
+    last_season = matrix[:, -season:].astype('float64')
+    forecast = np.tile(last_season, int(np.ceil(horizon / season)))[:, :horizon]
+    errors = matrix[:, season:] - matrix[:, :-season]
+    return forecast, _error_std(errors)
+
+
+# Forecast methods by name; each takes (matrix, horizon, **params) and returns (forecast, error std)
+FORECAST_METHODS = {
+    'moving_average': moving_average_forecast,
+    'exponential_smoothing': exponential_smoothing_forecast,
+    'seasonal_naive': seasonal_naive_forecast
+}
+
+
+def _error_std(errors: np.ndarray) -> np.ndarray:
+    """Per-row std of forecast errors (0 when there are too few)"""
+    if errors.shape[1] < 2:
+        return np.zeros(errors.shape[0])
+    return errors.std(axis=1, ddof=1)
+
+
+class DemandForecaster:
+    """
+    Dense product x day revenue and quantity matrices, built once from the prepared data,
+    with per-product forecasts for every product at once
+    """
+
+    def __init__(self, data: pd.DataFrame, config: Dict):
+        """
+        Build the product x day matrices
+
+        Args:
+            data: Prepared transaction lines
+            config: Configuration dictionary with the column mapping
+        """
+        self.config = config
+
+        days = data[config['date_col']].dt.normalize()
+        valid = days.notna().to_numpy()
+        product_codes, self.products = pd.factorize(data[config['product_col']], sort=True)
+        valid &= product_codes >= 0
+
+        day_values = days.to_numpy()[valid]
+        self.days = pd.date_range(day_values.min(), day_values.max(), freq='D') if valid.any() else pd.DatetimeIndex([])
+        day_codes = ((day_values - day_values.min()) // np.timedelta64(1, 'D')).astype('int64') if valid.any() else day_values
+
+        # One flat bincount per measure: cell = product * n_days + day
+        cells = product_codes[valid] * len(self.days) + day_codes
+        shape = (len(self.products), len(self.days))
+        self.matrices = {
+            'revenue': np.bincount(cells, weights=data[config['revenue_col']].to_numpy()[valid], minlength=shape[0] * shape[1]).reshape(shape),
+            'quantity': np.bincount(cells, weights=data[config['quantity_col']].to_numpy()[valid], minlength=shape[0] * shape[1]).reshape(shape)
+        }
+        logger.debug(f"Forecast matrices: {shape[0]:,} products x {shape[1]:,} days")
+
+    def daily_totals(self, measure: str = 'revenue') -> pd.Series:
+        """All-product total per day, including days without sales"""
+        return pd.Series(self.matrices[measure].sum(axis=0), index=self.days)
+
+    def forecast(self, method: str = 'exponential_smoothing', horizon: int = 30, measure: str = 'quantity',
+                 z_score: float = 1.96, **params) -> pd.DataFrame:
+        """
+        Forecast every product with one model
+
+        Args:
+            method: Key of FORECAST_METHODS
+            horizon: Days to forecast
+            measure: 'quantity' or 'revenue'
+            z_score: Width of the interval (1.96 for 95%)
+            **params: Model parameters (window, alpha, season)
+
+        Returns:
+            DataFrame per product with daily average, horizon total and its interval, and error std
+        """
+        path, error_std = FORECAST_METHODS[method](self.matrices[measure], horizon, **params)
+        path = np.clip(path, 0, None)  # Demand is never negative
+        total = path.sum(axis=1)
+        total_std = error_std * np.sqrt(horizon)  # Daily errors assumed independent
+
+        result = pd.DataFrame({
+            'forecast_daily_avg': total / horizon if horizon else 0.0,
+            'forecast_total': total,
+            'interval_low': np.clip(total - z_score * total_std, 0, None),
+            'interval_high': total + z_score * total_std,
+            'daily_error_std': error_std
+        }, index=pd.Index(self.products, name=self.config['product_col']))
+        result.attrs.update({'method': method, 'horizon': horizon, 'measure': measure})
+        return result
+
+    def reorder_plan(self, lead_time_days: int = 7, service_z: float = 1.65, method: str = 'exponential_smoothing',
+                     horizon: int = 30, **params) -> pd.DataFrame:
+        """
+        Per-product reorder point and dead-stock risk from the quantity forecast
+
+        Args:
+            lead_time_days: Days between ordering and receiving stock
+            service_z: Safety stock z-score (1.65 covers ~95% of lead times)
+            method: Key of FORECAST_METHODS
+            horizon: Days ahead used to judge dead-stock risk
+            **params: Model parameters
+
+        Returns:
+            DataFrame per product with lead-time demand, safety stock, reorder point and expected units over the horizon
+        """
+        forecast = self.forecast(method=method, horizon=horizon, measure='quantity', **params)
+        lead_time_demand = forecast['forecast_daily_avg'] * lead_time_days
+        safety_stock = service_z * forecast['daily_error_std'] * np.sqrt(lead_time_days)
+
+        plan = pd.DataFrame({
+            'lead_time_demand': lead_time_demand,
+            'safety_stock': safety_stock,
+            'reorder_point': lead_time_demand + safety_stock,
+            'expected_units': forecast['forecast_total'],
+            'dead_stock_risk': forecast['forecast_total'] < 1  # Less than one unit expected over the horizon
+        })
+        return plan
@@ -0,0 +1,164 @@
+"""
+Itemsets Module
+Frequent itemset mining (FP-Growth) and association rules over the basket table
+"""
+
+from collections import Counter
+from itertools import combinations
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+
+class FPNode:
+    """Node of an FP-tree: one item on a shared prefix path, with the number of baskets through it"""
+    __slots__ = ('item', 'count', 'parent', 'children')
+
+    def __init__(self, item, parent):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children = {}
+
+
+def frequent_itemsets(baskets, min_support: float = 0.01, max_len: int = 4) -> pd.DataFrame:
+    """
+    Mine itemsets that appear in at least min_support of the baskets with FP-Growth
+
+    Args:
+        baskets: TransactionBaskets (its incidence matrix is used, so repeated lines count once)
+        min_support: Minimum share of baskets containing the itemset (0-1)
+        max_len: Largest itemset size to mine
+
+    Returns:
+        DataFrame with itemset (tuple of product codes, sorted), size, count and support
+    """
+    incidence = baskets.incidence()
+    n_transactions = incidence.shape[0]
+    min_count = max(1, int(np.ceil(min_support * n_transactions)))
+
+    # Keep frequent products only, renumbered by descending support (rank 0 = most frequent)
+    item_counts = np.asarray(incidence.sum(axis=0)).ravel()
+    frequent = np.flatnonzero(item_counts >= min_count)
+    ranked = frequent[np.argsort(-item_counts[frequent], kind='stable')]
+    if len(ranked) == 0:
+        return _itemset_frame({}, n_transactions)
+
+    # Each basket as its frequent items in rank order; identical baskets are inserted once with a count
+    ranked_incidence = incidence[:, ranked].tocsr()
+    ranked_incidence.sort_indices()
+    rows = np.split(ranked_incidence.indices, ranked_incidence.indptr[1:-1])
+    paths = Counter(tuple(row.tolist()) for row in rows if len(row) > 0)
+    header = _build_tree((path, count) for path, count in paths.items())
+
+    results = {}
+    _mine(header, (), min_count, max_len, results)
+
+    # Ranks back to product codes
+    itemsets = {tuple(sorted(ranked[list(ranks)].tolist())): count for ranks, count in results.items()}
+    logger.debug(f"FP-Growth: {len(itemsets)} itemsets (min_support={min_support}, max_len={max_len}) "
+                 f"from {len(paths):,} distinct baskets")
+    return _itemset_frame(itemsets, n_transactions)
+
+
+def association_rules(itemsets: pd.DataFrame, min_confidence: float = 0.5, min_len: int = 2) -> pd.DataFrame:
+    """
+    Derive rules antecedent -> consequent from frequent itemsets
+
+    Args:
+        itemsets: Output of frequent_itemsets
+        min_confidence: Minimum share of antecedent baskets that also hold the consequent (0-1)
+        min_len: Smallest itemset size to build rules from
+
+    Returns:
+        DataFrame with antecedent, consequent (tuples of product codes), itemset, support, confidence and lift
+    """
+    support = dict(zip(itemsets['itemset'], itemsets['support']))
+    rules = []
+    for itemset, itemset_support in support.items():
+        if len(itemset) < max(2, min_len):
+            continue
+        # Every subset of a frequent itemset is frequent, so its support is already known
+        for size in range(1, len(itemset)):
+            for antecedent in combinations(itemset, size):
+                confidence = itemset_support / support[antecedent]
+                if confidence < min_confidence:
+                    continue
+                consequent = tuple(item for item in itemset if item not in antecedent)
+                rules.append({
+                    'antecedent': antecedent,
+                    'consequent': consequent,
+                    'itemset': itemset,
+                    'support': itemset_support,
+                    'confidence': confidence,
+                    'lift': confidence / support[consequent]
+                })
+
+    columns = ['antecedent', 'consequent', 'itemset', 'support', 'confidence', 'lift']
+    return pd.DataFrame(rules, columns=columns)
+
+
+def _build_tree(paths) -> Dict[int, List[FPNode]]:
+    """Insert (path, count) pairs into a new FP-tree and return its header table (item -> nodes)"""
+    root = FPNode(None, None)
+    header = {}
+    for path, count in paths:
+        node = root
+        for item in path:
+            child = node.children.get(item)
+            if child is None:
+                child = FPNode(item, node)
+                node.children[item] = child
+                header.setdefault(item, []).append(child)
+            child.count += count
+            node = child
+    return header
+
+
+def _mine(header: Dict[int, List[FPNode]], suffix: Tuple, min_count: int, max_len: int, results: Dict):
+    """Grow itemsets from each header item's conditional tree, pruning infrequent items at every level"""
+    for item, nodes in header.items():
+        count = sum(node.count for node in nodes)
+        if count < min_count:
+            continue
+        itemset = (item,) + suffix
+        results[itemset] = count
+        if len(itemset) >= max_len:
+            continue
+
+        # Conditional pattern base: prefix paths leading to this item, weighted by its count there
+        base = []
+        path_counts = {}
+        for node in nodes:
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                path.reverse()
+                base.append((path, node.count))
+                for path_item in path:
+                    path_counts[path_item] = path_counts.get(path_item, 0) + node.count
+
+        keep = {path_item for path_item, path_count in path_counts.items() if path_count >= min_count}
+        if keep:
+            conditional = _build_tree(([i for i in path if i in keep], c) for path, c in base)
+            _mine(conditional, itemset, min_count, max_len, results)
+
+
+def _itemset_frame(itemsets: Dict[Tuple, int], n_transactions: int) -> pd.DataFrame:
+    """Itemset counts as a DataFrame sorted by count (largest first)"""
+    frame = pd.DataFrame({
+        'itemset': list(itemsets.keys()),
+        'size': [len(itemset) for itemset in itemsets],
+        'count': list(itemsets.values())
+    }, columns=['itemset', 'size', 'count'])
+    frame['support'] = frame['count'] / n_transactions if n_transactions else 0.0
+    return frame.sort_values(['count', 'size', 'itemset'], ascending=[False, True, True]).reset_index(drop=True)
@@ -0,0 +1,94 @@
+"""
+Metric Cache Module
+Registry of derived metrics that declares each metric's inputs, caches its result,
+and recomputes it only when the data version, one of its config keys or an upstream metric changes
+"""
+
+from typing import Callable, Iterable
+
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+
+class MetricRegistry:
+    """
+    Cached metrics keyed by their inputs.
+    A metric's key is the owner's data_version, the current values of its config keys and the
+    stamps of the metrics it depends on, so changing any input invalidates exactly its dependents.
+    """
+
+    def __init__(self, owner):
+        """
+        Initialize an empty registry
+
+        Args:
+            owner: Object exposing config (dict) and data_version (int), usually the analyzer
+        """
+        self.owner = owner
+        self.metrics = {}  # name -> (compute, config_keys, depends_on)
+        self.cache = {}  # name -> (key, stamp, value)
+        self.stamp = 0  # Incremented on every computation, so dependents see upstream recomputes
+
+    def register(self, name: str, compute: Callable, config_keys: Iterable[str] = (), depends_on: Iterable[str] = ()):
+        """
+        Declare a metric and its inputs
+
+        Args:
+            name: Metric name
+            compute: Function with no arguments that returns the metric
+            config_keys: Config keys the result depends on
+            depends_on: Names of registered metrics the result is built from
+        """
+        self.metrics[name] = (compute, tuple(config_keys), tuple(depends_on))
+        self.cache.pop(name, None)
+
+    def get(self, name: str):
+        """Return a metric, computing it only if one of its inputs changed since the cached result"""
+        key = self._key(name)
+        cached = self.cache.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[2]
+
+        compute = self.metrics[name][0]
+        logger.debug(f"Computing metric '{name}'")
+        value = compute()
+        self.stamp += 1
+        self.cache[name] = (key, self.stamp, value)
+        return value
+
+    def is_current(self, name: str) -> bool:
+        """Whether a cached result exists and its inputs are unchanged"""
+        cached = self.cache.get(name)
+        return cached is not None and cached[0] == self._key(name)
+
+    def invalidate(self, name: str = None):
+        """Drop one cached metric (or all of them); dependents follow through their keys"""
+        if name is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(name, None)
+
+    def _key(self, name: str) -> tuple:
+        """Current inputs of a metric: data version, config values and upstream stamps"""
+        _, config_keys, depends_on = self.metrics[name]
+        config = self.owner.config
+        upstream = []
+        for dependency in depends_on:
+            self.get(dependency)  # Brings the upstream metric up to date first
+            upstream.append(self.cache[dependency][1])
+        return (
+            self.owner.data_version,
+            tuple(_hashable(config.get(k)) for k in config_keys),
+            tuple(upstream)
+        )
+
+
+def _hashable(value):
+    """Config values compared by value (lists and dicts are frozen for the comparison)"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_hashable(v) for v in value)
+    return value
@@ -0,0 +1,116 @@
+"""
+Periods Module
+Period-over-period comparisons (WoW, MoM, QoQ and YoY) over the calendar levels of the sales cube:
+every period and every metric in one grouped pass, without touching the line items
+"""
+
+import numpy as np
+import pandas as pd
+from typing import List
+import warnings
+warnings.filterwarnings('ignore')
+
+from modules.cube import DAY_LEVELS, SalesCube, iso_year_week
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+
+def _week_start(labels: pd.Index) -> pd.DatetimeIndex:
+    """Monday of each ISO year-week label"""
+    return pd.to_datetime(pd.Index(labels) + '-1', format='%G-W%V-%u')
+
+
+def _previous_week(labels: pd.Index) -> pd.Index:
+    """ISO year-week before each label ('2025-W01' -> '2024-W52')"""
+    return pd.Index(iso_year_week(_week_start(labels) - pd.Timedelta(days=7)))
+
+
+def _year_ago_week(labels: pd.Index) -> pd.Index:
+    """Same ISO week of the previous ISO year (a week 53 may have no match)"""
+    labels = pd.Index(labels)
+    return (labels.str[:4].astype(int) - 1).astype(str) + labels.str[4:]
+
+
+# Calendar periods: cube level, name of the comparison, label of the previous period and of the same period a year earlier
+PERIODS = {
+    'week': {'level': 'iso_year_week', 'comparison': 'WoW', 'previous': _previous_week, 'year_ago': _year_ago_week},
+    'month': {'level': 'month', 'comparison': 'MoM', 'previous': lambda labels: labels - 1, 'year_ago': lambda labels: labels - 12},
+    'quarter': {'level': 'quarter', 'comparison': 'QoQ', 'previous': lambda labels: labels - 1, 'year_ago': lambda labels: labels - 4}
+}
+
+# Metrics besides the cube measures: distinct products, revenue per transaction, revenue minus cost
+DERIVED_METRICS = ['products', 'avg_transaction', 'gross_margin']
+DEFAULT_METRICS = ['revenue', 'transactions', 'products', 'avg_transaction']
+
+
+def compare_periods(cube: SalesCube, period: str = 'week', metrics: List[str] = None) -> pd.DataFrame:
+    """
+    Every period of the data with its metrics and their change versus the previous period and the year before
+
+    Args:
+        cube: Sales cube of the loaded data
+        period: 'week' (ISO year-week), 'month' or 'quarter'
+        metrics: Cube measures ('revenue', 'cost', 'quantity', 'lines', 'transactions') and/or
+            'products', 'avg_transaction', 'gross_margin' (default revenue, transactions, products, avg_transaction)
+
+    Returns:
+        DataFrame indexed by period (oldest first, periods without sales as 0) with the number of days of
+        data in each period and, per metric, its value, `<metric>_previous`, `<metric>_change_pct` (WoW/MoM/QoQ)
+        and `<metric>_yoy_pct`. Changes are NaN where the earlier period is outside the data or not positive.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period '{period}'. Options: {', '.join(PERIODS)}")
+    spec = PERIODS[period]
+    level = spec['level']
+    metrics = list(metrics or DEFAULT_METRICS)
+    unknown = [m for m in metrics if m not in cube.measures + DERIVED_METRICS or m == 'last_sale']
+    if unknown or ('gross_margin' in metrics and 'cost' not in cube.measures):
+        raise ValueError(f"Unavailable metrics {unknown or ['gross_margin']}. Options: "
+                         f"{', '.join([m for m in cube.measures if m != 'last_sale'] + DERIVED_METRICS)}")
+
+    # Calendar dimension: period of every day in the data range, so empty periods still get a row
+    calendar = DAY_LEVELS[level](cube.daily(['lines']).index)
+    days = pd.Series(calendar).value_counts().sort_index()
+    labels = days.index
+
+    measures = [m for m in metrics if m in cube.measures]
+    if 'avg_transaction' in metrics:
+        measures += ['revenue', 'transactions']
+    if 'gross_margin' in metrics:
+        measures += ['revenue', 'cost']
+    measures = list(dict.fromkeys(measures))
+    rolled = cube.rollup(level, measures).reindex(labels, fill_value=0) if measures else pd.DataFrame(index=labels)
+
+    values = {m: rolled[m] for m in metrics if m in cube.measures}
+    if 'products' in metrics:
+        values['products'] = (cube.rollup([level, 'product'], ['lines']).groupby(level=level).size()
+                              .reindex(labels, fill_value=0))
+    if 'avg_transaction' in metrics:
+        values['avg_transaction'] = rolled['revenue'] / rolled['transactions'].where(rolled['transactions'] > 0)
+    if 'gross_margin' in metrics:
+        values['gross_margin'] = rolled['revenue'] - rolled['cost']
+
+    previous_labels = spec['previous'](labels)
+    year_ago_labels = spec['year_ago'](labels)
+    table = {'days': days.to_numpy()}
+    for metric in metrics:
+        current = values[metric].to_numpy(dtype='float64')
+        previous = values[metric].reindex(previous_labels).to_numpy(dtype='float64')
+        year_ago = values[metric].reindex(year_ago_labels).to_numpy(dtype='float64')
+        table[metric] = values[metric].to_numpy()
+        table[f'{metric}_previous'] = previous
+        table[f'{metric}_change_pct'] = _change_pct(current, previous)
+        table[f'{metric}_yoy_pct'] = _change_pct(current, year_ago)
+
+    comparison = pd.DataFrame(table, index=pd.Index(labels, name=level))
+    comparison.attrs.update({'period': period, 'comparison': spec['comparison']})
+    logger.debug(f"Period comparison: {len(comparison)} {period}s, {len(metrics)} metrics")
+    return comparison
+
+
+def _change_pct(current: np.ndarray, base: np.ndarray) -> np.ndarray:
+    """Percent change from base (NaN where the base is missing or not positive)"""
+    valid = base > 0  # NaN compares False
+    return np.divide(current - base, base, out=np.full(len(current), np.nan), where=valid) * 100
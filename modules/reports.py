@@ -1,43 +1,23 @@
 from typing import Optional
 from contextlib import redirect_stdout
 import os
-def weekly_comparison_report(analyzer) -> str:
+def weekly_comparison_report(analyzer, trailing_weeks: int = 4) -> str:
+    """Generate week-over-week comparison (ISO year-weeks, so weeks across a year boundary stay apart)"""
     import pandas as pd
-    """Generate week-over-week comparison"""
-    data = analyzer.data
-    
-    # Get last two weeks
-    data['week'] = pd.to_datetime(data[analyzer.config['date_col']]).dt.isocalendar().week # Extract week number
-    last_week = data['week'].max() # Last week number
-    prev_week = last_week - 1 # Previous week number
-    
-    last_week_data = data[data['week'] == last_week] # Data for last week
-    prev_week_data = data[data['week'] == prev_week] # Data for previous week
-    
-    # Calculate metrics
-    metrics = {
-        'Last Week': {
-            'Revenue': last_week_data[analyzer.config['revenue_col']].sum(), # Total revenue
-            'Transactions': last_week_data[analyzer.config['transaction_col']].nunique(), # Unique transactions
-            'Products Sold': last_week_data[analyzer.config['product_col']].nunique(), # Unique products sold
-            'Avg Transaction': last_week_data.groupby(analyzer.config['transaction_col'])[analyzer.config['revenue_col']].sum().mean() # Average transaction value
-        },
-        'Previous Week': {
-            'Revenue': prev_week_data[analyzer.config['revenue_col']].sum(),
-            'Transactions': prev_week_data[analyzer.config['transaction_col']].nunique(),
-            'Products Sold': prev_week_data[analyzer.config['product_col']].nunique(),
-            'Avg Transaction': prev_week_data.groupby(analyzer.config['transaction_col'])[analyzer.config['revenue_col']].sum().mean()
-        }
+    from modules.periods import compare_periods
+
+    # Every week comes from one grouped pass over the shared sales cube
+    weeks = compare_periods(analyzer.cube, 'week', ['revenue', 'transactions', 'products', 'avg_transaction'])
+    last_week = weeks.iloc[-1] # Last ISO week of the data
+
+    # Metric name -> column of the comparison table
+    columns = {
+        'Revenue': 'revenue',
+        'Transactions': 'transactions',
+        'Products Sold': 'products',
+        'Avg Transaction': 'avg_transaction'
     }
-    
-    # Calculate changes
-    changes = {}
-    for metric in ['Revenue', 'Transactions', 'Products Sold', 'Avg Transaction']:
-        prev_val = metrics['Previous Week'][metric]
-        last_val = metrics['Last Week'][metric]
-        change = ((last_val - prev_val) / prev_val * 100) if prev_val > 0 else 0
-        changes[metric] = change
-        
+
     # Print report
     from modules.translations import get_text
 
@@ -56,23 +36,36 @@ def weekly_comparison_report(analyzer) -> str:
         'Avg Transaction': get_text('avg_transaction', lang)
     }
 
-    for metric in ['Revenue', 'Transactions', 'Products Sold', 'Avg Transaction']:
-        arrow = '↑' if changes[metric] > 0 else '↓' if changes[metric] < 0 else '→'
-        color = '🟢' if changes[metric] > 0 else '🔴' if changes[metric] < -5 else '🟡'
+    for metric, column in columns.items():
+        change = last_week[f'{column}_change_pct']
+        change = 0 if pd.isna(change) else change # No change without a previous week to compare
+        arrow = '↑' if change > 0 else '↓' if change < 0 else '→'
+        color = '🟢' if change > 0 else '🔴' if change < -5 else '🟡'
 
+        last_val = last_week[column]
+        prev_val = last_week[f'{column}_previous']
+        prev_val = 0 if pd.isna(prev_val) and metric != 'Avg Transaction' else prev_val
         if metric == 'Revenue' or metric == 'Avg Transaction':
-            last_val = analyzer.format_currency(metrics['Last Week'][metric])
-            prev_val = analyzer.format_currency(metrics['Previous Week'][metric])
+            last_val = analyzer.format_currency(last_val)
+            prev_val = analyzer.format_currency(prev_val)
         else:
-            last_val = f"{metrics['Last Week'][metric]:,}"
-            prev_val = f"{metrics['Previous Week'][metric]:,}"
+            last_val = f"{int(last_val):,}"
+            prev_val = f"{int(prev_val):,}"
 
         metric_label = metric_translations.get(metric, metric)
         report_lines.append(f"\n{metric_label}:")
         report_lines.append(f"  {get_text('last_week', lang)}:     {last_val}")
         report_lines.append(f"  {get_text('previous_week', lang)}: {prev_val}")
-        report_lines.append(f"  {get_text('change', lang)}:        {color} {arrow} {abs(changes[metric]):.2f}%")
-    
+        report_lines.append(f"  {get_text('change', lang)}:        {color} {arrow} {abs(change):.2f}%")
+
+    # Trailing weeks table (already computed above, so showing more weeks costs nothing)
+    if trailing_weeks > 0:
+        report_lines.append(f"\n{get_text('trailing_weeks', lang, n=min(trailing_weeks, len(weeks)))}:")
+        for week, row in weeks.tail(trailing_weeks).iterrows():
+            change = f"{row['revenue_change_pct']:+.1f}%" if pd.notna(row['revenue_change_pct']) else '-'
+            report_lines.append(f"  {week} ({int(row['days'])}d): {analyzer.format_currency(row['revenue']):>16}  {change:>8}"
+                                f"  | {int(row['transactions']):,} {get_text('transactions', lang)}")
+
     report_str = "\n".join(report_lines)
     
     return report_str
@@ -0,0 +1,143 @@
+"""
+Rolling KPIs Module
+KPIs over a trailing window for every day at once, from prefix sums of the daily cube totals:
+any window's revenue or transactions is one subtraction, so "growth as of a date" is a lookup
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict
+import warnings
+warnings.filterwarnings('ignore')
+
+from modules.cube import SalesCube
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+
+class RollingKPIs:
+    """
+    Trailing-window revenue, transactions, average ticket, active products and growth versus the
+    prior window of the same length, for every day of the data. Day t's window covers the `window`
+    days ending on t (inclusive); days without a full window (or full prior window, for growth) are NaN.
+    """
+
+    def __init__(self, cube: SalesCube):
+        """
+        Build the prefix sums and the product activity spans
+
+        Args:
+            cube: Sales cube of the loaded data
+        """
+        daily = cube.daily(['revenue', 'transactions'])
+        self.days = daily.index
+        n_days = len(self.days)
+
+        # prefix[k] = total of the first k days, so days [a, b) sum to prefix[b] - prefix[a]
+        self._revenue = np.concatenate([[0.0], np.cumsum(daily['revenue'].to_numpy(dtype='float64'))])
+        self._transactions = np.concatenate([[0], np.cumsum(daily['transactions'].to_numpy(dtype='int64'))])
+
+        # Each (product, day) with sales keeps the product active until its next sale day
+        product_days = cube.rollup(['day', 'product'], ['lines']).index
+        day_positions = self.days.get_indexer(product_days.get_level_values('day'))
+        product_codes = pd.factorize(product_days.get_level_values('product'))[0]
+        order = np.lexsort((day_positions, product_codes))
+        next_sale = np.full(len(order), n_days, dtype='int64')
+        same_product = product_codes[order][1:] == product_codes[order][:-1]
+        next_sale[order[:-1][same_product]] = day_positions[order][1:][same_product]
+        self._sale_days = day_positions
+        self._next_sale = next_sale
+
+        self._active = {}  # Active products per day, by window
+        logger.debug(f"Rolling KPIs: {n_days} days, {len(product_days):,} product-days")
+
+    def active_products(self, window: int) -> np.ndarray:
+        """
+        Distinct products sold in the window ending on each day.
+        A sale on day d counts for the windows ending on d up to the day before the product's next
+        sale (or d + window - 1), so one +1/-1 pair per product-day and a cumsum give every day at once.
+        """
+        if window not in self._active:
+            n_days = len(self.days)
+            end = np.minimum(self._next_sale, self._sale_days + window)
+            changes = (np.bincount(self._sale_days, minlength=n_days + 1)
+                       - np.bincount(end, minlength=n_days + window + 1)[:n_days + 1])
+            self._active[window] = np.cumsum(changes)[:n_days]
+        return self._active[window]
+
+    def series(self, window: int = 30) -> pd.DataFrame:
+        """
+        KPIs for every day
+
+        Args:
+            window: Days in each trailing window
+
+        Returns:
+            DataFrame indexed by day with revenue, transactions, avg_transaction_value, active_products,
+            previous_revenue (the window before) and revenue_growth (%)
+        """
+        end = np.arange(1, len(self.days) + 1)
+        start = end - window
+        previous_start = start - window
+        complete = start >= 0
+        previous_complete = previous_start >= 0
+
+        revenue = self._window_sum(self._revenue, start, end)
+        transactions = self._window_sum(self._transactions, start, end)
+        previous = self._window_sum(self._revenue, previous_start, start)
+        average = np.divide(revenue, transactions, out=np.zeros(len(end)), where=transactions > 0)
+        growth = np.divide(revenue - previous, previous, out=np.zeros(len(end)), where=previous > 0) * 100
+
+        return pd.DataFrame({
+            'revenue': np.where(complete, revenue, np.nan),
+            'transactions': np.where(complete, transactions, np.nan),
+            'avg_transaction_value': np.where(complete, average, np.nan),
+            'active_products': np.where(complete, self.active_products(window), np.nan),
+            'previous_revenue': np.where(previous_complete, previous, np.nan),
+            'revenue_growth': np.where(previous_complete, growth, np.nan)
+        }, index=self.days)
+
+    def as_of(self, date, window: int = 30) -> Dict:
+        """
+        KPIs of the window ending on a date, from the prefix sums (no pass over the data)
+
+        Args:
+            date: Last day of the window
+            window: Days in the window
+
+        Returns:
+            Dict with the columns of series() for that day, plus the window start and end
+        """
+        day = pd.Timestamp(date).normalize()
+        position = self.days.get_indexer([day])[0]
+        if position < 0:
+            raise ValueError(f"{day.date()} is outside the data ({self.days[0].date()} to {self.days[-1].date()})")
+        end = position + 1
+        start = end - window
+        if start < 0:
+            raise ValueError(f"Not enough history for a {window}-day window ending on {day.date()}")
+
+        revenue = self._revenue[end] - self._revenue[start]
+        transactions = int(self._transactions[end] - self._transactions[start])
+        previous = self._revenue[start] - self._revenue[start - window] if start >= window else np.nan
+        if np.isnan(previous):
+            growth = np.nan
+        else:
+            growth = (revenue - previous) / previous * 100 if previous > 0 else 0
+        return {
+            'start': self.days[start],
+            'end': day,
+            'revenue': revenue,
+            'transactions': transactions,
+            'avg_transaction_value': revenue / transactions if transactions else 0,
+            'active_products': int(self.active_products(window)[position]),
+            'previous_revenue': previous,
+            'revenue_growth': growth
+        }
+
+    @staticmethod
+    def _window_sum(prefix: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """Sums of days [start, end) for many windows at once (starts before the data are clipped)"""
+        return prefix[np.maximum(end, 0)] - prefix[np.maximum(start, 0)]
@@ -0,0 +1,93 @@
+"""
+Snapshot Cache Module
+On-disk cache of prepared data, keyed by a fingerprint of the source file and config
+"""
+
+import os
+import json
+import hashlib
+import pandas as pd
+from typing import Dict, Optional
+
+from modules.logger import get_logger
+
+# Initialize logger for this module
+logger = get_logger(__name__)
+
+# Bump when Business._prepare_frame changes so older snapshots are not reused
+SNAPSHOT_VERSION = 2
+
+
+def source_fingerprint(data_source: str, config: Dict, hash_content: bool = False) -> str:
+    """
+    Build a cache key for a source file and the config that shapes its prepared frame
+
+    Args:
+        data_source: Path to the source file
+        config: Configuration dictionary (column mapping and compact mode are part of the key)
+        hash_content: Also hash the file bytes instead of trusting size and mtime
+
+    Returns:
+        Hex digest identifying the prepared snapshot
+    """
+    stat = os.stat(data_source)
+    key = {
+        'version': SNAPSHOT_VERSION,
+        'path': os.path.abspath(data_source),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'columns': {k: v for k, v in sorted(config.items()) if k.endswith('_col')},
+        'compact': bool(config.get('compact', False))
+    }
+
+    if hash_content:
+        digest = hashlib.sha1()
+        with open(data_source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        key['content'] = digest.hexdigest()
+
+    return hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _snapshot_path(cache_dir: str, fingerprint: str) -> str:
+    """Path of the snapshot file for a fingerprint"""
+    return os.path.join(cache_dir, f"prepared_{fingerprint}.feather")
+
+
+def load_snapshot(cache_dir: str, fingerprint: str) -> Optional[pd.DataFrame]:
+    """
+    Read a prepared snapshot, memory-mapped, if one exists for the fingerprint
+
+    Returns:
+        Prepared DataFrame, or None on a cache miss
+    """
+    path = _snapshot_path(cache_dir, fingerprint)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        import pyarrow.feather as feather
+        data = feather.read_table(path, memory_map=True).to_pandas()
+    except Exception as e:
+        logger.warning(f"Could not read snapshot {path}, re-preparing data: {e}")
+        return None
+
+    logger.info(f"Loaded prepared snapshot {path} {data.shape}")
+    return data
+
+
+def save_snapshot(data: pd.DataFrame, cache_dir: str, fingerprint: str):
+    """Write a prepared frame as an uncompressed Feather file (fast to memory-map)"""
+    path = _snapshot_path(cache_dir, fingerprint)
+    try:
+        import pyarrow.feather as feather
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        feather.write_feather(data.reset_index(drop=True), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)  # Atomic, so a concurrent notebook never reads a partial file
+    except Exception as e:
+        logger.warning(f"Could not write snapshot {path}: {e}")
+        return
+
+    logger.info(f"Saved prepared snapshot {path}")
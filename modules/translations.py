@@ -129,6 +129,7 @@ TRANSLATIONS = {
         'previous_week': 'Previous Week',
         'change': 'Change',
         'products_sold': 'Products Sold',
+        'trailing_weeks': 'Last {n} Weeks (revenue, WoW change)',
 
         # Transaction Segmentation
         'transaction_segments': 'Transaction Size Segments:',
@@ -175,11 +176,32 @@ TRANSLATIONS = {
         'moving_average_7d': '7-day MA',
         'daily_transactions_title': 'Daily Transactions',
         'num_transactions': 'Number of Transactions',
-        'top_products_weekly': 'Top 5 Products Weekly Performance',
+        'top_products_weekly': 'Top {n} Products Weekly Performance',
         'week_label': 'Week',
         'avg_revenue_by_dow': 'Average Revenue by Day of Week',
         'day_of_week_label': 'Day of Week',
 
+        # Cohort Analysis
+        'cohort_analysis_title': 'CUSTOMER COHORT ANALYSIS',
+        'cohort_retention_title': 'Customer Retention by Cohort (%)',
+        'cohort_month_label': 'First Purchase Month',
+        'months_since_first_label': 'Months Since First Purchase',
+        'new_customers': 'new customers',
+        'retention_after_months': 'Retention after {months} month(s)',
+        'avg_historical_clv': 'Avg Historical CLV',
+        'avg_monthly_value': 'Avg Monthly Value per Customer',
+
+        # Category / Location Breakdown
+        'breakdown_by_category': 'BREAKDOWN BY CATEGORY',
+        'breakdown_by_location': 'BREAKDOWN BY LOCATION',
+        'revenue_share': 'of revenue',
+
+        # Profitability
+        'gross_margin': 'Gross Margin',
+        'top_margin_products': 'Your top {count} products ({pct}% of catalog) generate {margin_pct}% of gross margin!',
+        'top_margin_generators': 'Top {n} Margin Generators',
+        'selling_below_cost': 'Selling Below Cost',
+
         # Velocity Matrix
         'velocity_matrix_title': 'Product Velocity Matrix',
         'size_revenue': 'Size = Revenue',
@@ -211,6 +233,9 @@ TRANSLATIONS = {
         'alert_high_concentration_msg': 'Top 20% of products generate {pct}% of revenue',
         'alert_high_concentration_impact': 'High dependency on few products',
         'alert_high_concentration_action': 'Diversify product portfolio',
+        'alert_negative_margin_msg': '{count} products sell below cost',
+        'alert_negative_margin_impact': '{amount} lost on their sales',
+        'alert_negative_margin_action': 'Review prices and supplier costs, or discontinue them',
         'alert_balanced_portfolio_msg': 'Revenue well distributed across products',
         'alert_balanced_portfolio_impact': 'Lower concentration risk',
         'alert_balanced_portfolio_action': 'Maintain current portfolio balance',
@@ -367,6 +392,7 @@ TRANSLATIONS = {
         'previous_week': 'Semana Anterior',
         'change': 'Cambio',
         'products_sold': 'Productos Vendidos',
+        'trailing_weeks': 'Últimas {n} Semanas (ingresos, cambio semanal)',
 
         # Transaction Segmentation
         'transaction_segments': 'Segmentos de Tamaño de Transacción:',
@@ -413,11 +439,32 @@ TRANSLATIONS = {
         'moving_average_7d': 'MA 7 días',
         'daily_transactions_title': 'Transacciones Diarias',
         'num_transactions': 'Número de Transacciones',
-        'top_products_weekly': 'Desempeño Semanal Top 5 Productos',
+        'top_products_weekly': 'Desempeño Semanal Top {n} Productos',
         'week_label': 'Semana',
         'avg_revenue_by_dow': 'Ingreso Promedio por Día de la Semana',
         'day_of_week_label': 'Día de la Semana',
 
+        # Cohort Analysis
+        'cohort_analysis_title': 'ANÁLISIS DE COHORTES DE CLIENTES',
+        'cohort_retention_title': 'Retención de Clientes por Cohorte (%)',
+        'cohort_month_label': 'Mes de Primera Compra',
+        'months_since_first_label': 'Meses desde la Primera Compra',
+        'new_customers': 'clientes nuevos',
+        'retention_after_months': 'Retención después de {months} mes(es)',
+        'avg_historical_clv': 'CLV Histórico Promedio',
+        'avg_monthly_value': 'Valor Mensual Promedio por Cliente',
+
+        # Category / Location Breakdown
+        'breakdown_by_category': 'DESGLOSE POR CATEGORÍA',
+        'breakdown_by_location': 'DESGLOSE POR UBICACIÓN',
+        'revenue_share': 'de los ingresos',
+
+        # Profitability
+        'gross_margin': 'Margen Bruto',
+        'top_margin_products': '¡Tus {count} productos principales ({pct}% del catálogo) generan {margin_pct}% del margen bruto!',
+        'top_margin_generators': 'Top {n} Generadores de Margen',
+        'selling_below_cost': 'Venta Bajo el Costo',
+
         # Velocity Matrix
         'velocity_matrix_title': 'Matriz de Velocidad de Productos',
         'size_revenue': 'Tamaño = Ingresos',
@@ -449,6 +496,9 @@ TRANSLATIONS = {
         'alert_high_concentration_msg': 'El top 20% de productos genera {pct}% de los ingresos',
         'alert_high_concentration_impact': 'Alta dependencia en pocos productos',
         'alert_high_concentration_action': 'Diversificar portafolio de productos',
+        'alert_negative_margin_msg': '{count} productos se venden bajo el costo',
+        'alert_negative_margin_impact': '{amount} perdidos en sus ventas',
+        'alert_negative_margin_action': 'Revisar precios y costos de proveedores, o descontinuarlos',
         'alert_balanced_portfolio_msg': 'Ingresos bien distribuidos entre productos',
         'alert_balanced_portfolio_impact': 'Menor riesgo de concentración',
         'alert_balanced_portfolio_action': 'Mantener balance actual del portafolio',
@@ -583,6 +633,10 @@ FILE_NAME_TRANSLATIONS = {
         'weekly_compare': 'weekly_compare',
         'customer_segmentation': 'customer_segmentation',
         'detailed_customer_segments': 'detailed_customer_segments',
+        'cohorts': 'cohorts',
+        'cohort_retention': 'cohort_retention',
+        'cohort_revenue': 'cohort_revenue',
+        'customer_clv': 'customer_clv',
         'executive_summary': 'executive_summary',
     },
     'ESP': {
@@ -602,6 +656,10 @@ FILE_NAME_TRANSLATIONS = {
         'weekly_compare': 'comparacion_semanal',
         'customer_segmentation': 'segmentacion_clientes',
         'detailed_customer_segments': 'segmentos_detallados_clientes',
+        'cohorts': 'cohortes',
+        'cohort_retention': 'retencion_cohortes',
+        'cohort_revenue': 'ingresos_cohortes',
+        'customer_clv': 'clv_clientes',
         'executive_summary': 'resumen_ejecutivo',
     }
 }